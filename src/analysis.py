@@ -1,19 +1,26 @@
-
-from statistics import mean
-from summary import Summary, Player
+from collections import OrderedDict
+from summary import Summary, get_summary_files
 from common import get_transform_typed
 
-from typing import Callable, List, Optional
+import numpy as np
+
+from typing import Dict, List, NamedTuple, Optional
 
 from pydantic import BaseModel
 
 ANALYSIS_FILENAME = 'analysis.json'
+ANALYSIS_VERSION = 1
 DEFAULT_HEIGHT_INCHES = 72
 DEFAULT_WEIGHT_POUNDS = 200
 DEFAULT_PERCENTAGE = 20
 MINUTES_IN_GAME = 40
 INJURY_PENALTY = -50
 HOMETOWN_MULTIPLIER = 5
+DEFAULT_CACHE_SIZE = 1024
+SCHOOL_CLASSES = ['Fr', 'Soph', 'Jr', 'Sr']
+INTELLIGENCE_SCORES = [50, 100, 200, 250, 99]
+SCORE_ATTRIBUTES = ['strength', 'dexterity', 'constitution', 'intelligence', 'wisdom', 'charisma', 'power']
+CHARISMA_COLUMN = SCORE_ATTRIBUTES.index('charisma')
 
 class Score(BaseModel):
     strength: int
@@ -39,6 +46,78 @@ class TeamScore(BaseModel):
 class Analysis(BaseModel):
     teams: List[TeamScore]
 
+class Features(NamedTuple):
+    names: List[List[str]]
+    mask: np.ndarray
+    counts: np.ndarray
+    points: np.ndarray
+    height: np.ndarray
+    steals: np.ndarray
+    field_goals: np.ndarray
+    three_pointers: np.ndarray
+    blocks: np.ndarray
+    weight: np.ndarray
+    injured: np.ndarray
+    school_class: np.ndarray
+    rebounds: np.ndarray
+    turnovers: np.ndarray
+    free_throws: np.ndarray
+    assists: np.ndarray
+    minutes: np.ndarray
+    hometown: np.ndarray
+
+class PlayerScores(NamedTuple):
+    features: Features
+    attributes: np.ndarray
+    charisma: np.ndarray
+
+class ScoreCache:
+    def __init__(self, size=DEFAULT_CACHE_SIZE):
+        self.size = size
+        self.players: Dict[int, PlayerScores] = {}
+        self.teams: OrderedDict = OrderedDict()
+
+    def score_team(self, team: Summary, location: Optional[str]) -> TeamScore:
+        players = self.get_players(team)
+        return to_team_score(team, players.features, 0, localize(players, location), self.score_vector(team, location))
+
+    def score_vector(self, team: Summary, location: Optional[str]) -> np.ndarray:
+        key = (team.team.index, location)
+        if key in self.teams:
+            self.teams.move_to_end(key)
+            return self.teams[key]
+        result = score_locations(self.get_players(team), [location])[0][0]
+        self.teams[key] = result
+        while len(self.teams) > self.size:
+            evicted, _ = self.teams.popitem(last=False)
+            self.evict_players(evicted[0])
+        return result
+
+    def get_players(self, team: Summary) -> PlayerScores:
+        index = team.team.index
+        if index not in self.players:
+            self.players[index] = score_players(get_features([team]))
+        return self.players[index]
+
+    def evict_players(self, index: int):
+        if not any(k[0] == index for k in self.teams):
+            self.players.pop(index, None)
+
+    def invalidate(self, index: int):
+        for key in [k for k in self.teams if k[0] == index]:
+            del self.teams[key]
+        self.players.pop(index, None)
+
+    def clear(self):
+        self.teams.clear()
+        self.players.clear()
+
+    def copy(self) -> 'ScoreCache':
+        cache = ScoreCache(self.size)
+        cache.players = dict(self.players)
+        cache.teams = OrderedDict(self.teams)
+        return cache
+
 def get_analysis(
         year: int, 
         teams: List[Summary], 
@@ -51,81 +130,165 @@ def get_analysis(
         transform_func=lambda s: score_teams(teams),
         load_func=Analysis,
         force_transform=force_transform,
+        inputs=get_summary_files(teams),
+        version=ANALYSIS_VERSION,
     )
 
-def score_teams(teams: List[Summary], location: Optional[str] = None) -> Analysis:
+def score_teams(
+        teams: List[Summary], 
+        location: Optional[str] = None,
+        cache: Optional[ScoreCache] = None,
+    ) -> Analysis:
+    if cache is not None:
+        return Analysis(
+            teams = [cache.score_team(s, location) for s in teams]
+        )
+    players = score_players(get_features(teams))
+    attributes = localize(players, location)
+    totals = combine(attributes, players.features)
     return Analysis(
-        teams = [score_team(s, location) for s in teams]
+        teams = [
+            to_team_score(s, players.features, i, attributes, totals[i])
+            for i, s in enumerate(teams)
+        ]
     )
 
-def score_team(team: Summary, location: Optional[str]) -> TeamScore:
-    players = [p for p in team.players if p.stats]
-    player_scores = [score_player(p, location) for p in players]
-    return TeamScore(
-        index = team.team.index,
-        name = team.team.name,
-        seed = team.team.seed,
-        score = combine_scores(player_scores),
-        players = player_scores,
+def score_team(
+        team: Summary, 
+        location: Optional[str],
+        cache: Optional[ScoreCache] = None,
+    ) -> TeamScore:
+    if cache is not None:
+        return cache.score_team(team, location)
+    return score_teams([team], location).teams[0]
+
+def score_vectors(
+        teams: List[Summary],
+        locations: List[str],
+        cache: Optional[ScoreCache] = None,
+    ) -> Dict[str, np.ndarray]:
+    if cache is not None:
+        return {l:np.array([cache.score_vector(s, l) for s in teams]) for l in locations}
+    players = score_players(get_features(teams))
+    return dict(zip(locations, score_locations(players, locations)))
+
+def get_features(teams: List[Summary]) -> Features:
+    players = [[p for p in s.players if p.stats] for s in teams]
+    empty = [s.team.name for s, team in zip(teams, players) if not team]
+    if empty:
+        raise Exception('No players with stats for: {}'.format(', '.join(empty)))
+    shape = (len(players), max([len(p) for p in players] + [0]))
+    def collect(get_value, dtype=float, fill=0) -> np.ndarray:
+        values = np.full(shape, fill, dtype=dtype)
+        for t, team in enumerate(players):
+            for p, player in enumerate(team):
+                values[t, p] = get_value(player)
+        return values
+    classes = {c:i for i, c in enumerate(SCHOOL_CLASSES)}
+    mask = collect(lambda p: True, bool, False)
+    return Features(
+        names = [[p.name for p in team] for team in players],
+        mask = mask,
+        counts = mask.sum(axis=-1),
+        points = collect(lambda p: p.stats.scoring.points_per_game),
+        height = collect(lambda p: p.info.height_inches or 0),
+        steals = collect(lambda p: p.stats.defense.steals_per_game),
+        field_goals = collect(lambda p: p.stats.scoring.field_goal_percentage or 0),
+        three_pointers = collect(lambda p: p.stats.scoring.three_point_field_goal_percentage or 0),
+        blocks = collect(lambda p: p.stats.defense.blocks_per_game),
+        weight = collect(lambda p: p.info.weight_pounds or 0),
+        injured = collect(lambda p: p.injury is not None, bool, False),
+        school_class = collect(lambda p: classes.get(p.info.school_class, len(SCHOOL_CLASSES)), int),
+        rebounds = collect(lambda p: p.stats.defense.rebounds_per_game),
+        turnovers = collect(lambda p: p.stats.assists.turnovers_per_game),
+        free_throws = collect(lambda p: p.stats.scoring.free_throw_percentage or 0),
+        assists = collect(lambda p: p.stats.assists.assists_per_game),
+        minutes = collect(lambda p: int(p.stats.overall.minutes_per_game), int),
+        hometown = collect(lambda p: p.info.hometown, object, None),
     )
 
-def combine_scores(players: List[PlayerScore]) -> Score:
-    def combine_stat(get_stat: Callable[[PlayerScore], int]) -> int:
-        return int(mean([get_stat(p) * p.minutes for p in players]) / MINUTES_IN_GAME)
-    return Score(
-        strength = combine_stat(lambda p: p.score.strength),
-        dexterity = combine_stat(lambda p: p.score.dexterity),
-        constitution = combine_stat(lambda p: p.score.constitution),
-        intelligence = combine_stat(lambda p: p.score.intelligence),
-        wisdom = combine_stat(lambda p: p.score.wisdom),
-        charisma = combine_stat(lambda p: p.score.charisma),
-        power = combine_stat(lambda p: p.score.power),
+def score_players(
+        f: Features,
+        percentage=DEFAULT_PERCENTAGE,
+        height_inches=DEFAULT_HEIGHT_INCHES,
+        weight_pounds=DEFAULT_WEIGHT_POUNDS,
+        injury_penalty=INJURY_PENALTY,
+        intelligence=INTELLIGENCE_SCORES,
+    ) -> PlayerScores:
+    height = np.where(f.height == 0, height_inches, f.height)
+    weight = np.where(f.weight == 0, weight_pounds, f.weight)
+    charisma = np.where(f.free_throws == 0, percentage, f.free_throws) * f.assists
+    attributes = np.stack(np.broadcast_arrays(
+        f.points * height,
+        f.steals * np.where(f.field_goals == 0, percentage, f.field_goals) * np.where(f.three_pointers == 0, percentage, f.three_pointers),
+        f.blocks * weight + np.where(f.injured, injury_penalty, 0),
+        np.take(np.asarray(intelligence, dtype=float), f.school_class, axis=-1),
+        f.rebounds * f.turnovers * height,
+        charisma,
+        height * weight,
+    ), axis=-1)
+    return PlayerScores(
+        features = f,
+        attributes = np.trunc(attributes),
+        charisma = charisma,
     )
 
-def score_player(player: Player, location: Optional[str]) -> PlayerScore:
-    return PlayerScore(
-        name = player.name,
-        score = Score(
-            strength = int(
-                player.stats.scoring.points_per_game * 
-                (player.info.height_inches or DEFAULT_HEIGHT_INCHES)
-            ),
-            dexterity = int(
-                player.stats.defense.steals_per_game *
-                (player.stats.scoring.field_goal_percentage or DEFAULT_PERCENTAGE) *
-                (player.stats.scoring.three_point_field_goal_percentage or DEFAULT_PERCENTAGE)
-            ),
-            constitution = int(
-                player.stats.defense.blocks_per_game * 
-                (player.info.weight_pounds or DEFAULT_WEIGHT_POUNDS) +
-                (INJURY_PENALTY if player.injury else 0)
-            ),
-            intelligence = int(
-                score_intelligence(player.info.school_class)
-            ),
-            wisdom = int(
-                player.stats.defense.rebounds_per_game *
-                player.stats.assists.turnovers_per_game * 
-                (player.info.height_inches or DEFAULT_HEIGHT_INCHES)
-            ),
-            charisma = int(
-                (player.stats.scoring.free_throw_percentage or DEFAULT_PERCENTAGE) *
-                player.stats.assists.assists_per_game *
-                (HOMETOWN_MULTIPLIER if location and player.info.hometown == location else 1)
-            ),
-            power = int(
-                (player.info.height_inches or DEFAULT_HEIGHT_INCHES) *
-                (player.info.weight_pounds or DEFAULT_WEIGHT_POUNDS)
+def localize(
+        players: PlayerScores,
+        location: Optional[str],
+        multiplier=HOMETOWN_MULTIPLIER,
+    ) -> np.ndarray:
+    if not location:
+        return players.attributes
+    attributes = players.attributes.copy()
+    local = np.trunc(players.charisma * multiplier)
+    attributes[..., CHARISMA_COLUMN] = np.where(players.features.hometown == location, local, attributes[..., CHARISMA_COLUMN])
+    return attributes
+
+def score_locations(
+        players: PlayerScores,
+        locations: List[Optional[str]],
+        multiplier=HOMETOWN_MULTIPLIER,
+    ) -> List[np.ndarray]:
+    f = players.features
+    neutral = combine(players.attributes, f)
+    results = []
+    for location in locations:
+        local = f.hometown == location
+        if not location or not local.any():
+            results.append(neutral)
+            continue
+        charisma = np.where(local, np.trunc(players.charisma * multiplier), players.attributes[..., CHARISMA_COLUMN])
+        result = neutral.copy()
+        result[..., CHARISMA_COLUMN] = combine(charisma[..., None], f)[..., 0]
+        results.append(result)
+    return results
+
+def combine(attributes: np.ndarray, f: Features) -> np.ndarray:
+    total = np.where(f.mask[..., None], attributes * f.minutes[..., None], 0).sum(axis=-2)
+    return np.trunc(total / f.counts[:, None] / MINUTES_IN_GAME)
+
+def to_team_score(
+        team: Summary,
+        f: Features,
+        index: int,
+        attributes: np.ndarray,
+        total: np.ndarray,
+    ) -> TeamScore:
+    return TeamScore(
+        index = team.team.index,
+        name = team.team.name,
+        seed = team.team.seed,
+        score = to_score(total),
+        players = [
+            PlayerScore(
+                name = name,
+                score = to_score(attributes[index, p]),
+                minutes = int(f.minutes[index, p]),
             )
-        ),
-        minutes = player.stats.overall.minutes_per_game,
+            for p, name in enumerate(f.names[index])
+        ],
     )
 
-def score_intelligence(school_class: str):
-    scores = {
-        'Fr': 50,
-        'Soph': 100,
-        'Jr': 200,
-        'Sr': 250,
-    }
-    return scores.get(school_class, '99')
\ No newline at end of file
+def to_score(values: np.ndarray) -> Score:
+    return Score(**dict(zip(SCORE_ATTRIBUTES, values.astype(np.int64).tolist())))
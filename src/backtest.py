@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+
+import argparse
+import importlib
+import os
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from bracket import BRACKET_FILENAME, Bracket, get_bracket_topology
+from common import DATA_DIR, get_year_storage
+from matchup import MatchupTable, build_matchups
+from summary import SUMMARY_TEAM_FORMAT, Summary
+from tourney import clear_results, get_actual_results, get_round_points, run_tourney, with_entrants
+from trusted import load_trusted
+
+BACKTEST_FILENAME = 'backtest.json'
+DEFAULT_PREDICTOR = 'model'
+
+Predictor = Callable[[Bracket, List[Summary], MatchupTable], Bracket]
+
+class RoundResult(BaseModel):
+    round: int
+    correct: int
+    total: int
+
+class SeasonResult(BaseModel):
+    year: int
+    correct: int
+    total: int
+    points: int
+    max_points: int
+    champion: bool
+    rounds: List[RoundResult]
+
+class BacktestResults(BaseModel):
+    predictor: str
+    seasons: List[SeasonResult]
+    failures: Dict[int, str]
+
+def main():
+    args = parse_args()
+    results = run_backtest(args.years, args.predictor, args.workers)
+    path = os.path.join(DATA_DIR, BACKTEST_FILENAME)
+    with open(path, 'w') as file:
+        file.write(results.json(indent=2))
+    print(pretty_backtest(results))
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Score predictions against past tournaments using cached data.')
+    parser.add_argument('years', type=int, nargs='+', help='cached tournament years with an actual.json')
+    parser.add_argument('--predictor', default=DEFAULT_PREDICTOR, help='predictor name, or module:function')
+    parser.add_argument('--workers', type=int, default=None, help='number of processes to evaluate seasons')
+    return parser.parse_args()
+
+def predict_model(bracket: Bracket, summaries: List[Summary], matchups: MatchupTable) -> Bracket:
+    return run_tourney(bracket, summaries, matchups)
+
+def predict_seed(bracket: Bracket, summaries: List[Summary], matchups: MatchupTable) -> Bracket:
+    topology = get_bracket_topology(bracket)
+    matches = {}
+    winner = None
+    for index in sorted(bracket.matches.keys()):
+        match = with_entrants(bracket, topology, index, matches)
+        match = match.copy(update={'winner': min(match.teams, key=lambda t: (bracket.teams[t].seed, t))})
+        matches[index] = match
+        if match.next_match_index is None:
+            winner = match.winner
+    return bracket.copy(update={'matches': matches, 'winner': winner})
+
+PREDICTORS: Dict[str, Predictor] = {
+    'model': predict_model,
+    'seed': predict_seed,
+}
+
+def get_predictor(name: str) -> Predictor:
+    if name in PREDICTORS:
+        return PREDICTORS[name]
+    if ':' not in name:
+        raise Exception('Unknown predictor: {}'.format(name))
+    module, function = name.split(':', 1)
+    return getattr(importlib.import_module(module), function)
+
+def run_backtest(
+        years: List[int],
+        predictor=DEFAULT_PREDICTOR,
+        workers: Optional[int] = None,
+    ) -> BacktestResults:
+    get_predictor(predictor)
+    workers = min(workers or os.cpu_count() or 1, len(years))
+    if workers <= 1:
+        outcomes = [backtest_year(y, predictor) for y in years]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            outcomes = list(executor.map(backtest_year, years, [predictor] * len(years)))
+    return BacktestResults(
+        predictor = predictor,
+        seasons = [s for s, _ in outcomes if s is not None],
+        failures = {y:e for y, (_, e) in zip(years, outcomes) if e is not None},
+    )
+
+def backtest_year(year: int, predictor=DEFAULT_PREDICTOR) -> Tuple[Optional[SeasonResult], Optional[str]]:
+    actual = get_actual_results(year)
+    if actual is None:
+        return (None, 'No actual results for {}'.format(year))
+    try:
+        bracket = clear_results(load_cached(year, BRACKET_FILENAME, Bracket))
+        summaries = [load_cached(year, SUMMARY_TEAM_FORMAT.format(t.safe_abbrev), Summary) for t in bracket.teams.values()]
+    except FileNotFoundError as ex:
+        return (None, 'Not cached: {}'.format(ex))
+    predicted = get_predictor(predictor)(bracket, summaries, build_matchups(bracket, summaries))
+    return (score_season(year, predicted, actual.winners), None)
+
+def load_cached(year: int, filename: str, cls):
+    return load_trusted(cls, get_year_storage(year).read(filename))
+
+def score_season(year: int, predicted: Bracket, winners: Dict[int, int]) -> SeasonResult:
+    topology = get_bracket_topology(predicted)
+    rounds = {r:RoundResult(round=r, correct=0, total=0) for r in range(topology.num_rounds)}
+    points = 0
+    max_points = 0
+    champion = False
+    for index, winner in winners.items():
+        match = predicted.matches[index]
+        hit = match.winner == winner
+        rounds[match.round].total += 1
+        rounds[match.round].correct += 1 if hit else 0
+        points += get_round_points(match.round, topology.main_round) if hit else 0
+        max_points += get_round_points(match.round, topology.main_round)
+        champion = champion or (hit and match.next_match_index is None)
+    return SeasonResult(
+        year = year,
+        correct = sum(r.correct for r in rounds.values()),
+        total = sum(r.total for r in rounds.values()),
+        points = points,
+        max_points = max_points,
+        champion = champion,
+        rounds = list(rounds.values()),
+    )
+
+def pretty_backtest(results: BacktestResults) -> str:
+    num_rounds = max([len(s.rounds) for s in results.seasons] + [0])
+    lines = ['Predictor: {}'.format(results.predictor)]
+    lines.append('{:<6} {:>9} {:>9} {:>8}  {}'.format(
+        'year', 'accuracy', 'points', 'champion', ' '.join('{:>7}'.format('R{}'.format(r + 1)) for r in range(num_rounds)),
+    ))
+    for s in results.seasons:
+        lines.append(pretty_row(str(s.year), s.correct, s.total, s.points, s.max_points, 'yes' if s.champion else 'no', s.rounds))
+    if len(results.seasons) > 1:
+        rounds = [
+            RoundResult(
+                round = r,
+                correct = sum(s.rounds[r].correct for s in results.seasons if r < len(s.rounds)),
+                total = sum(s.rounds[r].total for s in results.seasons if r < len(s.rounds)),
+            )
+            for r in range(num_rounds)
+        ]
+        lines.append(pretty_row(
+            'total',
+            sum(s.correct for s in results.seasons),
+            sum(s.total for s in results.seasons),
+            sum(s.points for s in results.seasons),
+            sum(s.max_points for s in results.seasons),
+            '{}/{}'.format(sum(s.champion for s in results.seasons), len(results.seasons)),
+            rounds,
+        ))
+    lines += ['Skipped {}: {}'.format(y, e) for y, e in results.failures.items()]
+    return '\n'.join(lines)
+
+def pretty_row(name: str, correct: int, total: int, points: int, max_points: int, champion: str, rounds: List[RoundResult]) -> str:
+    return '{:<6} {:>9} {:>9} {:>8}  {}'.format(
+        name,
+        format_rate(correct, total),
+        '{}/{}'.format(points, max_points),
+        champion,
+        ' '.join('{:>7}'.format(format_rate(r.correct, r.total)) for r in rounds),
+    )
+
+def format_rate(correct: int, total: int) -> str:
+    return '{:.0%}'.format(correct / total) if total else '-'
+
+if __name__ == '__main__':
+    main()
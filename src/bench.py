@@ -0,0 +1,396 @@
+#!/usr/bin/env python
+
+import argparse
+import hashlib
+import os.path
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+import common
+from common import DATA_DIR, raw_name, write_compressed
+from bracket import BRACKET_RAW_FILENAME, EXPECTED_NUM_TEAMS, Bracket, Team, compute_next_match_index, get_bracket, parse_raw_bracket
+from home import STATS_HOME_FILENAME, STATS_HOME_URL, get_team_urls, parse_urls
+from stats import STATS_TEAM_RAW_FORMAT, get_stats_for_team, parse_stats
+from roster import ROSTER_TEAM_RAW_FORMAT, get_roster_for_team, parse_roster
+from summary import Summary, get_info, get_summary_for_team
+from analysis import get_analysis, score_teams
+from matchup import build_matchups, get_matchups
+from tourney import get_tourney_results, pretty_bracket, run_tourney
+
+BENCH_YEAR = 2022
+BASELINE_FILENAME = 'bench_baseline.json'
+DEFAULT_PLAYERS = 15
+DEFAULT_HOME_TEAMS = 360
+DEFAULT_REPEAT = 3
+DEFAULT_TOLERANCE = 0.25
+MIN_REGRESSION_SECONDS = 0.002
+
+LOCATIONS = [
+    'Dayton, OH', 'Buffalo, NY', 'Fort Worth, TX', 'Indianapolis, IN',
+    'Pittsburgh, PA', 'Portland, OR', 'San Diego, CA', 'Greenville, SC',
+]
+HOMETOWNS = LOCATIONS + ['Chicago, IL', 'Toronto, Canada', 'Atlanta, GA', '—']
+POSITIONS = ['G', 'F', 'C']
+SEEDS = [1, 16, 8, 9, 5, 12, 4, 13, 6, 11, 3, 14, 7, 10, 2, 15]
+CLASSES = ['Fr', 'Soph', 'Jr', 'Sr']
+STATS_TABLES = {
+    'Player Stats - Scoring': [
+        ('GP', 'Games Played'), ('GS', 'Games Started'), ('MPG', 'Minutes Per Game'),
+        ('PPG', 'Points Per Game'), ('FGM', 'Field Goals Made'), ('FGA', 'Field Goals Attempted'),
+        ('FG%', 'Field Goal Percentage'), ('3FGM', '3-Point Field Goals Made'),
+        ('3FGA', '3-Point Field Goals Attempted'), ('3FG%', '3-Point Field Goal Percentage'),
+        ('FTM', 'Free Throws Made'), ('FTA', 'Free Throws Attempted'), ('FT%', 'Free Throw Percentage'),
+    ],
+    'Player Stats - Defense': [
+        ('OREB', 'Offensive Rebounds'), ('DREB', 'Defensive Rebounds'), ('REB', 'Total Rebounds'),
+        ('RPG', 'Rebounds Per Game'), ('STL', 'Steals'), ('SPG', 'Steals Per Game'),
+        ('BLK', 'Blocks'), ('BPG', 'Blocks Per Game'),
+    ],
+    'Player Stats - Assists/Turnovers': [
+        ('AST', 'Assists'), ('APG', 'Assists Per Game'), ('TO', 'Turnovers'),
+        ('TOPG', 'Turnovers Per Game'), ('A/TO', 'Assist to Turnover Ratio'),
+    ],
+}
+ROSTER_HEADERS = ['NO', 'Player', 'POS', 'HT', 'WT', 'CLASS', 'Hometown']
+
+class BenchConfig(BaseModel):
+    players: int
+    home_teams: int
+    repeat: int
+    seed: int
+
+class BenchReport(BaseModel):
+    config: BenchConfig
+    timings: Dict[str, float]
+    outputs: Dict[str, str]
+
+class Comparison(BaseModel):
+    name: str
+    baseline: float
+    current: float
+    regressed: bool
+
+def main():
+    args = parse_args()
+    config = BenchConfig(
+        players = args.players,
+        home_teams = args.home_teams,
+        repeat = args.repeat,
+        seed = args.seed,
+    )
+    report = run_bench(config)
+    print(pretty_report(report))
+    baseline = load_baseline(args.baseline)
+    failed = False
+    if baseline is not None:
+        if baseline.config != config:
+            print('Baseline was recorded with a different config: {}'.format(baseline.config))
+        else:
+            comparisons = compare_timings(baseline, report, args.tolerance)
+            changed = compare_outputs(baseline, report)
+            print(pretty_comparisons(comparisons, changed))
+            failed = any(c.regressed for c in comparisons) or bool(changed)
+    if args.save:
+        save_baseline(args.baseline, report)
+        print('Saved baseline to {}'.format(args.baseline))
+    sys.exit(1 if failed and not args.save else 0)
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Benchmark the pipeline on synthetic pages.')
+    parser.add_argument('--players', type=int, default=DEFAULT_PLAYERS, help='players on each roster')
+    parser.add_argument('--home-teams', type=int, default=DEFAULT_HOME_TEAMS, help='teams listed on the stats home page')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help='runs per stage, the fastest is kept')
+    parser.add_argument('--seed', type=int, default=0, help='random seed for generated pages')
+    parser.add_argument('--baseline', default=os.path.join(DATA_DIR, BASELINE_FILENAME), help='baseline file to compare against')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help='allowed slowdown before flagging a regression')
+    parser.add_argument('--save', action='store_true', help='save this run as the new baseline')
+    return parser.parse_args()
+
+def run_bench(config: BenchConfig) -> BenchReport:
+    root = tempfile.mkdtemp(prefix='madness-bench-')
+    original_data_dir = common.DATA_DIR
+    try:
+        fixtures = os.path.join(root, 'fixtures')
+        common.DATA_DIR = fixtures
+        teams = write_fixtures(BENCH_YEAR, config)
+        timings, outputs = time_stages(BENCH_YEAR, teams, config.repeat)
+        timings.update(time_pipeline(root, fixtures, config.repeat))
+        return BenchReport(
+            config = config,
+            timings = timings,
+            outputs = outputs,
+        )
+    finally:
+        common.DATA_DIR = original_data_dir
+        shutil.rmtree(root, ignore_errors=True)
+
+def time_stages(year: int, teams: List[Team], repeat: int) -> Tuple[Dict[str, float], Dict[str, str]]:
+    root = common.data_dir(year)
+    def raw_path(filename: str) -> str:
+        return os.path.join(root, raw_name(filename))
+    stats_paths = [raw_path(STATS_TEAM_RAW_FORMAT.format(t.safe_abbrev)) for t in teams]
+    roster_paths = [raw_path(ROSTER_TEAM_RAW_FORMAT.format(t.safe_abbrev)) for t in teams]
+    timings = {}
+    timings['parse_raw_bracket'], bracket = best_of(repeat, lambda: parse_raw_bracket(raw_path(BRACKET_RAW_FILENAME)))
+    timings['parse_urls'], _ = best_of(repeat, lambda: parse_urls(raw_path(STATS_HOME_FILENAME)))
+    timings['parse_stats'], stats = best_of(repeat, lambda: [parse_stats(p) for p in stats_paths])
+    timings['parse_roster'], rosters = best_of(repeat, lambda: [parse_roster(p) for p in roster_paths])
+    pages = list(zip(teams, rosters, stats))
+    timings['get_info'], summaries = best_of(repeat, lambda: [get_info(t, r, s) for t, r, s in pages])
+    timings['score_teams'], analysis = best_of(repeat, lambda: score_teams(summaries))
+    timings['build_matchups'], matchups = best_of(repeat, lambda: build_matchups(bracket, summaries))
+    timings['run_tourney'], result = best_of(repeat, lambda: run_tourney(bracket, summaries, matchups))
+    timings['pretty_bracket'], pretty = best_of(repeat, lambda: pretty_bracket(result))
+    outputs = {
+        'analysis': hash_text(analysis.json()),
+        'results': hash_text(pretty),
+    }
+    return (timings, outputs)
+
+def time_pipeline(root: str, fixtures: str, repeat: int) -> Dict[str, float]:
+    cold = []
+    warm = []
+    for _ in range(repeat):
+        common.DATA_DIR = tempfile.mkdtemp(dir=root)
+        shutil.copytree(os.path.join(fixtures, str(BENCH_YEAR)), common.data_dir(BENCH_YEAR))
+        cold.append(time_call(lambda: run_pipeline(BENCH_YEAR))[0])
+        warm.append(time_call(lambda: run_pipeline(BENCH_YEAR))[0])
+    return {
+        'pipeline_cold': min(cold),
+        'pipeline_warm': min(warm),
+    }
+
+def run_pipeline(year: int) -> Bracket:
+    bracket = get_bracket(year)
+    info = get_team_urls(year, bracket.teams.values())
+    summaries = []
+    for team in bracket.teams.values():
+        stats = get_stats_for_team(year, team, info)
+        roster = get_roster_for_team(year, team, info)
+        summaries.append(get_summary_for_team(year, team, roster, stats))
+    get_analysis(year, summaries)
+    matchups = get_matchups(year, bracket, summaries)
+    return get_tourney_results(year, bracket, summaries, matchups)
+
+def best_of(repeat: int, func: Callable[[], Any]) -> Tuple[float, Any]:
+    runs = [time_call(func) for _ in range(max(repeat, 1))]
+    return (min(r[0] for r in runs), runs[-1][1])
+
+def time_call(func: Callable[[], Any]) -> Tuple[float, Any]:
+    start = time.perf_counter()
+    result = func()
+    return (time.perf_counter() - start, result)
+
+def hash_text(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+def write_fixtures(year: int, config: BenchConfig) -> List[Team]:
+    rng = random.Random(config.seed)
+    teams = make_teams(EXPECTED_NUM_TEAMS)
+    write_fixture(year, BRACKET_RAW_FILENAME, make_bracket_page(teams, rng))
+    names = [get_full_name(t) for t in teams]
+    names += ['Other {:03d} Mascots'.format(i) for i in range(max(config.home_teams - len(teams), 0))]
+    rng.shuffle(names)
+    write_fixture(year, STATS_HOME_FILENAME, make_stats_home_page(names))
+    for team in teams:
+        players = ['{} Player {:02d}'.format(team.abbrev, i) for i in range(config.players)]
+        write_fixture(year, STATS_TEAM_RAW_FORMAT.format(team.safe_abbrev), make_stats_page(team, players, rng))
+        write_fixture(year, ROSTER_TEAM_RAW_FORMAT.format(team.safe_abbrev), make_roster_page(team, players, rng))
+    return teams
+
+def write_fixture(year: int, filename: str, text: str):
+    path = os.path.join(common.data_dir(year), raw_name(filename))
+    common.prepare_path(path, is_file=True)
+    write_compressed(path, text.encode(common.RAW_ENCODING))
+
+def make_teams(count: int) -> List[Team]:
+    return [make_team(i, 'S{:03d}'.format(i) if i % 16 else 'S/{:02d}'.format(i)) for i in range(count)]
+
+def make_team(index: int, abbrev: str) -> Team:
+    return Team(
+        index = index,
+        name = 'School {:03d}'.format(index),
+        abbrev = abbrev,
+        seed = SEEDS[index % len(SEEDS)],
+        safe_abbrev = abbrev.replace('/', '_'),
+    )
+
+def get_full_name(team: Team) -> str:
+    return '{} Mascots'.format(team.name)
+
+def make_bracket_page(teams: List[Team], rng: random.Random) -> str:
+    matchups = []
+    first_round = len(teams) // 2
+    for index in range(len(teams) - 1):
+        _, _, round = compute_next_match_index(index)
+        slots = teams[2*index:2*index+2] if index < first_round else []
+        matchups.append(
+            '<div class="matchup m_{}" data-index="{}" data-location="{}">{}</div>'.format(
+                round, index, LOCATIONS[(index % first_round) // 4 % len(LOCATIONS)],
+                ''.join(make_bracket_slot(t) for t in slots),
+            )
+        )
+    return (
+        '<html><head><title>Bracket</title><script>var bracket = {{"matchups": []}};</script></head>'
+        '<body><div class="nav"><a href="/">Home</a></div>'
+        '<div class="bracketWrapper">{}</div>'
+        '<div class="footer">{}</div></body></html>'
+    ).format(''.join(matchups), make_filler(rng, 40))
+
+def make_bracket_slot(team: Team) -> str:
+    return (
+        '<div class="slot s_{0}" data-slotindex="{0}">'
+        '<span class="actual"><span class="seed">{1}</span>'
+        '<span class="name">{2}</span><span class="abbrev">{3}</span></span>'
+        '<span class="picked"><span class="name">{2}</span></span></div>'
+    ).format(team.index, team.seed, team.name, team.abbrev)
+
+def make_stats_home_page(names: List[str]) -> str:
+    rows = ''.join(
+        '<tr class="TableBase-bodyTr"><td class="TableBase-bodyTd">'
+        '<span class="TeamName"><a href="/college-basketball/teams/T{0:03d}/{1}/">{2}</a></span>'
+        '</td></tr>'.format(i, name.lower().replace(' ', '-'), name)
+        for i, name in enumerate(names)
+    )
+    return (
+        '<html><head><link rel="canonical" href="{}"></head><body>'
+        '<div class="TableBase"><table><tbody>{}</tbody></table></div></body></html>'
+    ).format(STATS_HOME_URL, rows)
+
+def make_stats_page(team: Team, players: List[str], rng: random.Random) -> str:
+    played = [p for p in players if rng.random() > 0.05]
+    tables = ''.join(make_stats_table(name, columns, played, rng) for name, columns in STATS_TABLES.items())
+    return make_team_page(team, 'stats', tables, rng)
+
+def make_stats_table(name: str, columns: List[Tuple[str, str]], players: List[str], rng: random.Random) -> str:
+    header = ''.join(
+        '<th class="TableBase-headTh TableBase-headTh--number"><a href="#">{}</a>'
+        '<div class="Tooltip">{}</div></th>'.format(short, long)
+        for short, long in columns
+    )
+    rows = ''.join(
+        '<tr class="TableBase-bodyTr"><td class="TableBase-bodyTd">{}</td>{}</tr>'.format(
+            make_player_cell(player, rng.choice(POSITIONS)),
+            ''.join(
+                '<td class="TableBase-bodyTd TableBase-bodyTd--number">{}</td>'.format(make_stat(short, rng))
+                for short, _ in columns
+            ),
+        )
+        for player in players
+    )
+    total = '<tr class="TableBase-bodyTr TableBase-bodyTr--total"><td class="TableBase-bodyTd">Total</td></tr>'
+    return make_table(name, header, rows + total)
+
+def make_stat(name: str, rng: random.Random) -> str:
+    if name == 'GP':
+        return str(rng.randint(1, 35)) if rng.random() > 0.05 else '—'
+    if name.endswith('%') or name == 'A/TO':
+        return '{:.1f}'.format(rng.uniform(0, 100)) if rng.random() > 0.1 else '—'
+    if name.endswith('PG'):
+        return '{:.1f}'.format(rng.uniform(0, 30))
+    return str(rng.randint(0, 500))
+
+def make_roster_page(team: Team, players: List[str], rng: random.Random) -> str:
+    header = ''.join('<th class="TableBase-headTh">{}</th>'.format(h) for h in ROSTER_HEADERS)
+    rows = ''.join(
+        '<tr class="TableBase-bodyTr">{}</tr>'.format(''.join(
+            '<td class="TableBase-bodyTd">{}</td>'.format(v)
+            for v in make_roster_values(player, number, rng)
+        ))
+        for number, player in enumerate(players)
+    )
+    return make_team_page(team, 'roster', make_table('Roster', header, rows), rng)
+
+def make_roster_values(player: str, number: int, rng: random.Random) -> List[str]:
+    injury = rng.choice(['Knee', 'Ankle', 'Illness']) if rng.random() < 0.1 else None
+    return [
+        str(number),
+        make_player_cell(player, None, injury),
+        rng.choice(POSITIONS),
+        '{}-{}'.format(rng.randint(5, 7), rng.randint(0, 11)) if rng.random() > 0.05 else '—',
+        str(rng.randint(160, 280)) if rng.random() > 0.05 else '—',
+        rng.choice(CLASSES),
+        rng.choice(HOMETOWNS),
+    ]
+
+def make_player_cell(player: str, position: Optional[str], injury: Optional[str] = None) -> str:
+    extra = '<span class="CellPlayerName-position">{}</span>'.format(position) if position else ''
+    tooltip = (
+        '<span class="Tablebase-tooltip"><span class="Tablebase-tooltipInner">{}: Out for season</span></span>'.format(injury)
+        if injury else ''
+    )
+    return (
+        '<span class="CellPlayerName--short"><span><a href="#">{0}</a></span></span>'
+        '<span class="CellPlayerName--long"><span><a href="#">{0}</a>{1}</span>{2}</span>'
+    ).format(player, extra, tooltip)
+
+def make_table(name: str, header: str, rows: str) -> str:
+    return (
+        '<div class="TableBase"><h4 class="TableBase-title">{}</h4><div class="TableBase-overflow">'
+        '<table class="TableBase-table"><thead><tr>{}</tr></thead><tbody>{}</tbody></table></div></div>'
+    ).format(name, header, rows)
+
+def make_team_page(team: Team, kind: str, body: str, rng: random.Random) -> str:
+    return (
+        '<html><head><link rel="canonical" href="{0}{1}/{2}/"><script>var tables = "<div class=TableBase>";</script></head>'
+        '<body><div class="Nav">{3}</div><h1 class="PageTitle-header">{4}</h1>{5}<div class="Footer">{3}</div></body></html>'
+    ).format(STATS_HOME_URL, team.safe_abbrev, kind, make_filler(rng, 200), get_full_name(team), body)
+
+def make_filler(rng: random.Random, count: int) -> str:
+    return ''.join(
+        '<div class="Ad"><a href="/link/{0}">Link {0}</a><p>{1}</p></div>'.format(i, 'x' * rng.randint(10, 80))
+        for i in range(count)
+    )
+
+def load_baseline(path: str) -> Optional[BenchReport]:
+    if not os.path.isfile(path):
+        return None
+    return BenchReport.parse_file(path)
+
+def save_baseline(path: str, report: BenchReport):
+    common.prepare_path(path, is_file=True)
+    with open(path, 'w') as file:
+        file.write(report.json(indent=2))
+
+def compare_timings(baseline: BenchReport, report: BenchReport, tolerance: float) -> List[Comparison]:
+    return [
+        Comparison(
+            name = name,
+            baseline = baseline.timings[name],
+            current = current,
+            regressed = (
+                current > baseline.timings[name] * (1 + tolerance) and
+                current - baseline.timings[name] > MIN_REGRESSION_SECONDS
+            ),
+        )
+        for name, current in report.timings.items()
+        if name in baseline.timings
+    ]
+
+def compare_outputs(baseline: BenchReport, report: BenchReport) -> List[str]:
+    return [name for name, value in report.outputs.items() if baseline.outputs.get(name, value) != value]
+
+def pretty_report(report: BenchReport) -> str:
+    lines = ['{:<20} {:>10}'.format('stage', 'seconds')]
+    lines += ['{:<20} {:>10.4f}'.format(name, seconds) for name, seconds in report.timings.items()]
+    return '\n'.join(lines)
+
+def pretty_comparisons(comparisons: List[Comparison], changed: List[str]) -> str:
+    lines = ['{:<20} {:>10} {:>10} {:>8}'.format('stage', 'baseline', 'current', 'ratio')]
+    for c in comparisons:
+        ratio = c.current / c.baseline if c.baseline else float('inf')
+        lines.append('{:<20} {:>10.4f} {:>10.4f} {:>7.2f}x{}'.format(
+            c.name, c.baseline, c.current, ratio, ' REGRESSION' if c.regressed else '',
+        ))
+    lines += ['Output changed: {}'.format(name) for name in changed]
+    return '\n'.join(lines)
+
+if __name__ == '__main__':
+    main()
@@ -1,26 +1,98 @@
 #!/usr/bin/env python
 
-from typing import List, Optional, Dict, Tuple
+from functools import lru_cache
+from typing import List, NamedTuple, Optional, Dict, Tuple
 
-from bs4 import BeautifulSoup
 from pydantic import BaseModel
 
-from common import get_or_download_path, get_transform_typed
+from common import get_or_download_path, get_transform_typed, raw_name
+from soup import make_soup
 
 BRACKET_URL_FORMAT = 'https://fantasy.espn.com/tournament-challenge-bracket/{}/en/bracket'
 BRACKET_RAW_FILENAME = 'bracket.html'
 BRACKET_FILENAME = 'bracket.json'
+BRACKET_VERSION = 3
 EXPECTED_NUM_TEAMS = 64
+FIRST_FOUR_NUM_TEAMS = 68
+SEEDS_PER_REGION = 16
+BRACKET_REGIONS = ['bracketWrapper']
 
-def matches_per_round():
-    num_teams = EXPECTED_NUM_TEAMS
-    rounds = []
-    while num_teams > 1:
-        num_teams = int(num_teams / 2)
-        rounds.append(num_teams)
-    return rounds
+class Topology(NamedTuple):
+    num_teams: int
+    num_rounds: int
+    main_round: int
+    matches_per_round: List[int]
+    parent: List[int]
+    round: List[int]
+    slot: List[int]
+    teams_in_round: List[int]
+    feeders: List[List[int]]
 
-EXPECTED_MATCHES_PER_ROUND = matches_per_round()
+def get_field_size(num_teams: int) -> Tuple[int, int]:
+    main = 1 << (num_teams.bit_length() - 1)
+    return main, num_teams - main
+
+def get_default_play_in_slots(num_teams: int) -> Tuple[int, ...]:
+    main, play_ins = get_field_size(num_teams)
+    return tuple(2 * (p * (main // 2) // play_ins) + 1 for p in range(play_ins))
+
+@lru_cache(maxsize=None)
+def get_topology(num_teams: int, play_in_slots: Optional[Tuple[int, ...]] = None) -> Topology:
+    main, play_ins = get_field_size(num_teams)
+    play_in_slots = play_in_slots or get_default_play_in_slots(num_teams)
+    if len(play_in_slots) != play_ins:
+        raise Exception('Expected {} play-in slots, got {}'.format(play_ins, len(play_in_slots)))
+    matches_per_round = ([play_ins] if play_ins else []) + [main >> (r + 1) for r in range(main.bit_length() - 1)]
+    main_round = 1 if play_ins else 0
+    offsets = [sum(matches_per_round[:r]) for r in range(len(matches_per_round))]
+    num_matches = sum(matches_per_round)
+    parent = [-1] * num_matches
+    slot = [-1] * num_matches
+    round = [0] * num_matches
+    feeders = [[-1, -1] for _ in range(num_matches)]
+    for r, count in enumerate(matches_per_round):
+        for position in range(count):
+            index = offsets[r] + position
+            round[index] = r
+            if r < main_round:
+                target = play_in_slots[position]
+                if not 0 <= target < main:
+                    raise Exception('Play-in slot out of range: {}'.format(target))
+                parent[index] = offsets[main_round] + target // 2
+                slot[index] = target % 2
+            elif r + 1 < len(matches_per_round):
+                parent[index] = offsets[r + 1] + position // 2
+                slot[index] = position % 2
+            if parent[index] >= 0:
+                if feeders[parent[index]][slot[index]] >= 0:
+                    raise Exception('Match {} slot {} is fed twice'.format(parent[index], slot[index]))
+                feeders[parent[index]][slot[index]] = index
+    topology = Topology(
+        num_teams = num_teams,
+        num_rounds = len(matches_per_round),
+        main_round = main_round,
+        matches_per_round = matches_per_round,
+        parent = parent,
+        round = round,
+        slot = slot,
+        teams_in_round = [2 * matches_per_round[r] for r in round],
+        feeders = feeders,
+    )
+    check_topology(topology)
+    return topology
+
+def check_topology(topology: Topology):
+    play_ins = topology.matches_per_round[0] if topology.main_round else 0
+    parents = [topology.parent[p] for p in range(play_ins)]
+    if len(set(parents)) != play_ins:
+        raise Exception('Play-ins must feed distinct matches: {}'.format(parents))
+    for index, parent in enumerate(parents):
+        others = [f for f in topology.feeders[parent] if f != index]
+        if topology.round[parent] != topology.main_round or others != [-1]:
+            raise Exception('Play-in {} must meet a direct entrant in match {}'.format(index, parent))
+
+EXPECTED_MATCHES_PER_ROUND = get_topology(EXPECTED_NUM_TEAMS).matches_per_round
+check_topology(get_topology(FIRST_FOUR_NUM_TEAMS))
 
 class Team(BaseModel):
     index: int
@@ -53,30 +125,50 @@ def get_bracket(year, force_transform=False, force_fetch=False) -> Bracket:
         load_func=Bracket,
         force_transform=force_transform,
         force_fetch=force_fetch,
+        inputs=[raw_name(BRACKET_RAW_FILENAME)],
+        version=BRACKET_VERSION,
     )
 
-def parse_raw_bracket(path):
-    with open(path) as file:
-        soup = BeautifulSoup(file, features='html.parser')
+def parse_raw_bracket(path, fast=True):
+    soup = make_soup(path, fast, BRACKET_REGIONS)
     wrapper = soup.find(class_ = 'bracketWrapper')
     matchups = wrapper.find_all(class_ = 'matchup')
-    all_teams = []
-    parsed = [parse_matchup(m, all_teams) for m in matchups]
+    parsed = [(m, [parse_team(t) for t in m.find_all(class_ = 'actual')]) for m in matchups]
+    teams = {t.index: t for _, match_teams in parsed for t in match_teams}
+    topology = get_topology(len(teams), route_play_ins({int(m['data-index']): t for m, t in parsed}, len(teams)))
     return Bracket(
-        matches = {m.index: m for m in parsed},
-        teams = {t.index: t for t in all_teams},
+        matches = {m.index: m for m in [parse_matchup(m, t, topology) for m, t in parsed]},
+        teams = teams,
     )
 
-def parse_matchup(soup, all_teams: List[Team]):
-    teams = soup.find_all(class_ = 'actual')
-    parsed_teams = [parse_team(t) for t in teams]
-    all_teams.extend(parsed_teams)
+def route_play_ins(matches: Dict[int, List[Team]], num_teams: int) -> Optional[Tuple[int, ...]]:
+    main, play_ins = get_field_size(num_teams)
+    if not play_ins:
+        return None
+    main_matches = list(range(play_ins, play_ins + main // 2))
+    targets: Dict[int, int] = {}
+    for p in range(play_ins):
+        entrants = set(t.index for t in matches[p])
+        listed = [m for m in main_matches if entrants & set(t.index for t in matches[m])]
+        if listed:
+            targets[p] = listed[0]
+    for p in range(play_ins):
+        if p in targets:
+            continue
+        waiting = [m for m in main_matches if len(matches[m]) == 1 and m not in targets.values()]
+        paired = [m for m in waiting if matches[m][0].seed + matches[p][0].seed == SEEDS_PER_REGION + 1]
+        if not paired and not waiting:
+            raise Exception('No open match for play-in {}'.format(p))
+        targets[p] = (paired or waiting)[0]
+    return tuple(2 * (targets[p] - play_ins) + 1 for p in range(play_ins))
+
+def parse_matchup(soup, teams: List[Team], topology: Topology):
     index = int(soup['data-index'])
-    next_match_index, teams_in_round, round = compute_next_match_index(index)
+    next_match_index, teams_in_round, round = get_match_position(topology, index)
     return Match(
         location = soup['data-location'], 
         index = index,
-        teams = [t.index for t in parsed_teams],
+        teams = [t.index for t in teams],
         teams_in_round = teams_in_round,
         round = round,
         next_match_index = next_match_index,
@@ -92,24 +184,32 @@ def parse_team(soup):
         safe_abbrev = abbrev.replace('/', '_')
     )
 
-def compute_next_match_index(index):
-    round = 0
-    num_matches_in_round = EXPECTED_MATCHES_PER_ROUND[round]
-    curr = index
-    total_matches = num_matches_in_round
-    while curr >= num_matches_in_round:
-        curr -= num_matches_in_round
-        round += 1
-        if round >= len(EXPECTED_MATCHES_PER_ROUND) - 1:
-            return (None, 1, round)
-        num_matches_in_round = EXPECTED_MATCHES_PER_ROUND[round]
-        total_matches += num_matches_in_round
-    ratio = curr / num_matches_in_round
-    matches_in_next_round = EXPECTED_MATCHES_PER_ROUND[round+1]
-    place_in_next_round = ratio * matches_in_next_round
-    result = total_matches + place_in_next_round
-    teams_in_round = num_matches_in_round * 2
-    return (int(result), teams_in_round, round)
+def compute_next_match_index(index, num_teams=EXPECTED_NUM_TEAMS):
+    return get_match_position(get_topology(num_teams), index)
+
+def get_match_position(topology: Topology, index: int) -> Tuple[Optional[int], int, int]:
+    parent = topology.parent[index]
+    return (parent if parent >= 0 else None, topology.teams_in_round[index], topology.round[index])
+
+def get_bracket_topology(bracket: Bracket) -> Topology:
+    num_teams = len(bracket.teams)
+    _, play_ins = get_field_size(num_teams)
+    if not play_ins:
+        return get_topology(num_teams)
+    return get_topology(num_teams, tuple(2 * (bracket.matches[p].next_match_index - play_ins) + 1 for p in range(play_ins)))
+
+def get_entrants(bracket: Bracket, topology: Topology, index: int) -> List[Optional[int]]:
+    feeders = topology.feeders[index]
+    teams = bracket.matches[index].teams
+    if all(f < 0 for f in feeders):
+        return list(teams)
+    if all(f >= 0 for f in feeders):
+        return [None, None]
+    fed = set(t for f in feeders if f >= 0 for t in bracket.matches[f].teams)
+    direct = [t for t in teams if t not in fed]
+    if len(direct) != 1:
+        raise Exception('Match {} needs exactly one direct entrant, got {}'.format(index, direct))
+    return [None if f >= 0 else direct[0] for f in feeders]
 
 def get_raw_bracket_path(year, force=False):
     return get_or_download_path(year, bracket_url(year), BRACKET_RAW_FILENAME, force)
@@ -1,14 +1,25 @@
+import gzip
+import hashlib
+import io
 import json
 from operator import is_
+import os
 import os.path
-import requests
+import threading
 
 from json import JSONDecodeError
 from pathlib import Path
-from typing import Any, Callable, List, Type, TypeVar, TextIO
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple, Type, TypeVar, TextIO
 
 from appdirs import AppDirs
-from pydantic import ValidationError
+from pydantic import BaseModel, ValidationError
+from instrument import FETCHED, FORCED, HIT, INVALIDATED, LOAD_FAILED, MISS, NOT_MODIFIED, lazy_import, track
+from manifest import is_fresh, write_manifest
+from storage import FileStorage, get_storage
+from trusted import dump_trusted, load_trusted
+
+if TYPE_CHECKING:
+    import requests
 
 APP_NAME = 'madness'
 APP_AUTHOR = 'davidtorosyan'
@@ -17,6 +28,22 @@ dirs = AppDirs(APP_NAME, APP_AUTHOR)
 DATA_DIR = dirs.user_data_dir
 
 DEFAULT_YEAR = 2022
+DEFAULT_POOL_SIZE = 16
+COMPRESSED_SUFFIX = '.gz'
+RAW_META_FORMAT = '{}.meta'
+RAW_ENCODING = 'utf-8'
+
+_session: Optional['requests.Session'] = None
+_session_pool_size = 0
+_session_pool_target = DEFAULT_POOL_SIZE
+_session_lock = threading.Lock()
+
+class RawMeta(BaseModel):
+    url: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    sha256: str
+    size: int
 
 def data_dir(year):
     return os.path.join(DATA_DIR, str(year))
@@ -27,21 +54,113 @@ def data_dir_assert(year: int) -> str:
     return path
 
 def get_or_download_path(year: int, url: str, filename: str, force=False):
-    path = os.path.join(data_dir(year), filename)
-    if not os.path.isfile(path) or force:
-        download_path(year, url, filename)
-    return path
+    if force or not get_year_storage(year).exists(find_raw_name(year, filename)):
+        download_path(year, url, filename, revalidate=force)
+    return raw_path(year, filename)
+
+def raw_name(filename: str) -> str:
+    return filename + COMPRESSED_SUFFIX
+
+def find_raw_name(year: int, filename: str) -> str:
+    storage = get_year_storage(year)
+    if storage.exists(filename) and not storage.exists(raw_name(filename)):
+        return filename
+    return raw_name(filename)
+
+def raw_path(year: int, filename: str) -> str:
+    return os.path.join(data_dir(year), find_raw_name(year, filename))
+
+def open_raw(path: str) -> TextIO:
+    if not os.path.isfile(path):
+        year, name = split_data_path(path)
+        stream = io.BytesIO(get_year_storage(year).read_bytes(name))
+        if path.endswith(COMPRESSED_SUFFIX):
+            return gzip.open(stream, 'rt', encoding=RAW_ENCODING)
+        return io.TextIOWrapper(stream, encoding=RAW_ENCODING)
+    if path.endswith(COMPRESSED_SUFFIX):
+        return gzip.open(path, 'rt', encoding=RAW_ENCODING)
+    return open(path)
+
+def split_data_path(path: str) -> Tuple[str, str]:
+    year, _, name = os.path.relpath(path, DATA_DIR).partition(os.sep)
+    return (year, name.replace(os.sep, '/'))
+
+def reserve_pool(pool_size: int):
+    global _session_pool_target
+    with _session_lock:
+        _session_pool_target = max(_session_pool_target, pool_size)
 
-def download_path(year, url, filename):
+def get_session(pool_size=DEFAULT_POOL_SIZE) -> 'requests.Session':
+    global _session, _session_pool_size
+    with _session_lock:
+        pool_size = max(pool_size, _session_pool_target)
+        if _session is None:
+            _session = lazy_import('requests').Session()
+        if pool_size > _session_pool_size:
+            adapter = lazy_import('requests.adapters').HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            _session.mount('http://', adapter)
+            _session.mount('https://', adapter)
+            _session_pool_size = pool_size
+        return _session
+
+def download_path(year, url, filename, revalidate=False):
+    with track(filename, 'download') as event:
+        fetch_path(year, url, filename, revalidate, event)
+
+def fetch_path(year, url, filename, revalidate, event):
     path = os.path.join(data_dir(year), filename)
     prepare_path(path, is_file=True)
-    result = requests.get(url = url)
+    meta = load_raw_meta(path) if revalidate and os.path.isfile(path + COMPRESSED_SUFFIX) else None
+    result = get_session().get(url = url, headers = get_revalidation_headers(meta))
+    event.bytes = len(result.content)
+    if result.status_code == 304 and meta is not None:
+        event.outcome = NOT_MODIFIED
+        return
     if result.ok:
-        with open(path, 'w') as file:
-            print(result.text, file=file)
+        event.outcome = FETCHED
+        content = result.text.encode(RAW_ENCODING)
+        sha256 = hashlib.sha256(content).hexdigest()
+        if meta is None or meta.sha256 != sha256:
+            write_compressed(path + COMPRESSED_SUFFIX, content)
+        save_raw_meta(path, RawMeta(
+            url = url,
+            etag = result.headers.get('ETag'),
+            last_modified = result.headers.get('Last-Modified'),
+            sha256 = sha256,
+            size = len(content),
+        ))
+        if os.path.isfile(path):
+            os.remove(path)
     else:
         raise Exception('Failed to download {} with status code: {}'.format(url, result.status_code))
 
+def write_compressed(path: str, content: bytes):
+    temp_path = '{}.{}.{}.tmp'.format(path, os.getpid(), threading.get_ident())
+    with open(temp_path, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as file:
+        file.write(content)
+    os.replace(temp_path, path)
+
+def get_revalidation_headers(meta: Optional[RawMeta]) -> Dict[str, str]:
+    headers = {}
+    if meta is not None and meta.etag:
+        headers['If-None-Match'] = meta.etag
+    if meta is not None and meta.last_modified:
+        headers['If-Modified-Since'] = meta.last_modified
+    return headers
+
+def load_raw_meta(path: str) -> Optional[RawMeta]:
+    try:
+        return RawMeta.parse_file(RAW_META_FORMAT.format(path))
+    except (FileNotFoundError, PermissionError, ValueError):
+        return None
+
+def save_raw_meta(path: str, meta: RawMeta):
+    meta_path = RAW_META_FORMAT.format(path)
+    temp_path = '{}.{}.{}.tmp'.format(meta_path, os.getpid(), threading.get_ident())
+    with open(temp_path, 'w') as file:
+        file.write(meta.json(indent=2))
+    os.replace(temp_path, meta_path)
+
 def prepare_path(path, is_file=False):
     dir = Path(path).parent if is_file else Path(path)
     dir.mkdir(parents=True, exist_ok=True)
@@ -53,20 +172,24 @@ def get_transform_typed(
         filename: str, 
         raw_func: Callable[[int, bool], str],
         transform_func: Callable[[str], T],
-        load_func: Callable[[Any], T],
+        load_func: Type[T],
         force_transform=False, 
         force_fetch=False,
+        inputs: Optional[List[str]] = None,
+        version=0,
     ) -> T:
     return get_transform(
         year=year, 
         filename=filename,
         raw_func=raw_func,
         transform_func=transform_func,
-        load_func=lambda fp: load_func(**json.load(fp)),
-        save_func=lambda fp, result: json.dump(result.dict(), fp, indent=2),
+        load_func=lambda fp: load_trusted(load_func, fp.read()),
+        save_func=lambda fp, result: fp.write(dump_trusted(result)),
         load_exceptions=[JSONDecodeError, ValidationError],
         force_transform=force_transform,
         force_fetch=force_fetch,
+        inputs=inputs,
+        version=version,
     )
 
 def get_transform(
@@ -79,22 +202,42 @@ def get_transform(
         load_exceptions: List[Type],
         force_transform=False, 
         force_fetch=False,
+        inputs: Optional[List[str]] = None,
+        version=0,
     ) -> T:
-    path = os.path.join(data_dir(year), filename)
-    if os.path.isfile(path) and not force_transform and not force_fetch:
-        try:
-            with open(path) as file:
-                return load_func(file)
-        except (FileNotFoundError, PermissionError) as ex:
-            pass # TODO log error
-        except Exception as ex:
-            if type(ex) in load_exceptions:
-                pass # TODO log error
-            else:
-                raise
-    raw_path = raw_func(year, force=force_fetch)
-    result = transform_func(raw_path)
-    prepare_path(path, is_file=True)
-    with open(path, 'w') as file:
-        save_func(file, result)
-    return result
\ No newline at end of file
+    storage = get_year_storage(year)
+    with track(filename) as event:
+        event.outcome = FORCED if force_transform or force_fetch else get_cache_outcome(year, filename, inputs, version)
+        if event.outcome == HIT:
+            try:
+                return load_func(io.StringIO(storage.read(filename)))
+            except (FileNotFoundError, PermissionError) as ex:
+                event.outcome = LOAD_FAILED
+                event.error = repr(ex)
+            except Exception as ex:
+                if not isinstance(ex, tuple(load_exceptions)):
+                    raise
+                event.outcome = LOAD_FAILED
+                event.error = repr(ex)
+        raw_path = raw_func(year, force=force_fetch)
+        result = transform_func(raw_path)
+        buffer = io.StringIO()
+        save_func(buffer, result)
+        storage.write(filename, buffer.getvalue())
+        if inputs is not None:
+            write_manifest(storage, filename, inputs, version)
+        return result
+
+def is_cached(year: int, filename: str, inputs: Optional[List[str]], version=0) -> bool:
+    return get_cache_outcome(year, filename, inputs, version) == HIT
+
+def get_cache_outcome(year: int, filename: str, inputs: Optional[List[str]], version=0) -> str:
+    storage = get_year_storage(year)
+    if not storage.exists(filename):
+        return MISS
+    if inputs is not None and not is_fresh(storage, filename, inputs, version):
+        return INVALIDATED
+    return HIT
+
+def get_year_storage(year: int) -> FileStorage:
+    return get_storage(data_dir(year))
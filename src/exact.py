@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+
+import numpy as np
+
+from bracket import BRACKET_FILENAME, Bracket
+from matchup import MATCHUPS_FILENAME, MatchupTable, build_matchups
+from simulate import SIMULATE_STAGE, Plan, TeamOdds, get_win_probabilities, plan_bracket, to_bracket
+from tourney import ACTUAL_FILENAME
+from summary import Summary
+from common import get_transform_typed
+from instrument import track
+
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+EXACT_FILENAME = 'exact.json'
+EXACT_VERSION = 1
+LEAF_BACK = np.full((1, 4), -1)
+
+Outcomes = Dict[int, Tuple[np.ndarray, np.ndarray]]
+
+class ExactOdds(BaseModel):
+    teams: List[TeamOdds]
+
+def get_exact_odds(
+        year: int,
+        bracket: Bracket,
+        summaries: List[Summary],
+        matchups: Optional[MatchupTable] = None,
+        force_transform=False,
+    ) -> ExactOdds:
+    return get_transform_typed(
+        year=year,
+        filename=EXACT_FILENAME,
+        raw_func=lambda y,force=False: None,
+        transform_func=lambda s: compute_exact_odds(bracket, summaries, matchups),
+        load_func=ExactOdds,
+        force_transform=force_transform,
+        inputs=[BRACKET_FILENAME, MATCHUPS_FILENAME, ACTUAL_FILENAME],
+        version=EXACT_VERSION,
+    )
+
+def compute_exact_odds(
+        bracket: Bracket,
+        summaries: List[Summary],
+        matchups: Optional[MatchupTable] = None,
+    ) -> ExactOdds:
+    plan = plan_bracket(bracket)
+    probabilities = get_win_probabilities(plan, matchups or build_matchups(bracket, summaries))
+    with track('exact_odds', SIMULATE_STAGE):
+        reach = advance(plan, probabilities)
+    return ExactOdds(
+        teams = [
+            TeamOdds(
+                index = t,
+                name = bracket.teams[t].name,
+                seed = bracket.teams[t].seed,
+                rounds = reach[i, :-1].tolist(),
+                champion = float(reach[i, -1]),
+            )
+            for i, t in enumerate(plan.team_ids)
+        ],
+    )
+
+def advance(plan: Plan, probabilities: np.ndarray) -> np.ndarray:
+    num_teams = len(plan.team_ids)
+    reach = np.zeros((num_teams, plan.num_rounds + 1))
+    winners = win_distributions(plan, probabilities)
+    for i in plan.order:
+        for side in get_sides(plan, i, winners):
+            reach[:, plan.rounds[i]] += side
+        if plan.next_match[i] is None:
+            reach[:, plan.num_rounds] += winners[i]
+    return reach
+
+def win_distributions(plan: Plan, probabilities: np.ndarray) -> Dict[int, np.ndarray]:
+    winners: Dict[int, np.ndarray] = {}
+    for i in plan.order:
+        left, right = get_sides(plan, i, winners)
+        winners[i] = play_match(plan, probabilities, i, left, right)
+    return winners
+
+def get_sides(plan: Plan, index: int, winners: Dict[int, np.ndarray]) -> List[np.ndarray]:
+    num_teams = len(plan.team_ids)
+    return [
+        winners[f] if f >= 0 else np.eye(num_teams)[p]
+        for f, p in zip(plan.feeders[index], plan.initial[index])
+    ]
+
+def play_match(
+        plan: Plan,
+        probabilities: np.ndarray,
+        index: int,
+        left: np.ndarray,
+        right: np.ndarray,
+    ) -> np.ndarray:
+    if index in plan.decided:
+        return np.eye(len(left))[plan.decided[index]]
+    p = probabilities[plan.location_index[index]]
+    return left * (p @ right) + right * (left @ (1 - p))
+
+def top_brackets(bracket: Bracket, plan: Plan, probabilities: np.ndarray, top: int) -> List[Tuple[float, Bracket]]:
+    with track('top_brackets', SIMULATE_STAGE):
+        ranked = rank_outcomes(plan, probabilities, top)
+        final = [i for i in plan.order if plan.next_match[i] is None][0]
+        winners, ranks, logp = flatten_outcomes(ranked[final])
+        best = np.argsort(-logp, kind='stable')[:top]
+        brackets = []
+        for w, r in zip(winners[best].tolist(), ranks[best].tolist()):
+            picks: Dict[int, int] = {}
+            unwind(plan, ranked, final, w, r, picks)
+            brackets.append(to_bracket(bracket, plan, np.array([picks[i] for i in plan.order])))
+    return [(float(np.exp(p)), b) for p, b in zip(logp[best].tolist(), brackets)]
+
+def rank_outcomes(plan: Plan, probabilities: np.ndarray, top: int) -> Dict[int, Outcomes]:
+    ranked: Dict[int, Outcomes] = {}
+    for i in plan.order:
+        sides = [
+            ranked[f] if f >= 0 else {p: (np.zeros(1), LEAF_BACK)}
+            for f, p in zip(plan.feeders[i], plan.initial[i])
+        ]
+        log_p = np.log(probabilities[plan.location_index[i]])
+        outcomes: Outcomes = {}
+        for side in range(2):
+            opponents, opponent_ranks, opponent_logp = flatten_outcomes(sides[1 - side])
+            for winner, (logp, _) in sides[side].items():
+                if i in plan.decided and plan.decided[i] != winner:
+                    continue
+                scores = opponent_logp + (0 if i in plan.decided else log_p[winner, opponents])
+                keep = np.argsort(-scores, kind='stable')[:top]
+                total = logp[:, None] + scores[keep][None, :]
+                order = np.argsort(-total, axis=None, kind='stable')[:top]
+                rank, column = np.unravel_index(order, total.shape)
+                mine = [np.full(len(order), winner), rank]
+                theirs = [opponents[keep][column], opponent_ranks[keep][column]]
+                back = np.stack(mine + theirs if side == 0 else theirs + mine, axis=1)
+                outcomes[winner] = (total.ravel()[order], back)
+        ranked[i] = outcomes
+    return ranked
+
+def flatten_outcomes(outcomes: Outcomes) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    winners = np.concatenate([np.full(len(logp), w) for w, (logp, _) in outcomes.items()])
+    ranks = np.concatenate([np.arange(len(logp)) for logp, _ in outcomes.values()])
+    logp = np.concatenate([logp for logp, _ in outcomes.values()])
+    return winners, ranks, logp
+
+def unwind(plan: Plan, ranked: Dict[int, Outcomes], index: int, winner: int, rank: int, picks: Dict[int, int]):
+    picks[index] = winner
+    back = ranked[index][winner][1][rank].tolist()
+    for f, (w, r) in zip(plan.feeders[index], [back[:2], back[2:]]):
+        if f >= 0:
+            unwind(plan, ranked, f, w, r, picks)
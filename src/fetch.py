@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+
+import threading
+import urllib.parse
+
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from bracket import Team
+from common import reserve_pool
+from home import TeamInfo
+from roster import get_roster_raw
+from stats import get_stats_raw
+
+DEFAULT_FETCH_WORKERS = 16
+DEFAULT_HOST_CONCURRENCY = 8
+
+class HostLimiter:
+    def __init__(self, per_host: int):
+        self.per_host = per_host
+        self.lock = threading.Lock()
+        self.semaphores: Dict[str, threading.Semaphore] = {}
+
+    def get(self, url: str) -> threading.Semaphore:
+        host = urllib.parse.urlparse(url).netloc
+        with self.lock:
+            if host not in self.semaphores:
+                self.semaphores[host] = threading.BoundedSemaphore(self.per_host)
+            return self.semaphores[host]
+
+def fetch_team_pages(
+        year: int,
+        teams: Iterable[Team],
+        info: TeamInfo,
+        workers=DEFAULT_FETCH_WORKERS,
+        per_host=DEFAULT_HOST_CONCURRENCY,
+        force=False,
+        executor: Optional[Executor] = None,
+    ) -> List[str]:
+    jobs = list(get_team_jobs(teams, info))
+    return fetch_all(year, jobs, workers, per_host, force, executor)
+
+def get_team_jobs(
+        teams: Iterable[Team],
+        info: TeamInfo,
+    ) -> Iterable[Tuple[str, Callable[[int, bool], str]]]:
+    for team in teams:
+        urls = info.urls[team.index]
+        yield (urls.stats, lambda y, force, u=urls.stats, a=team.safe_abbrev: get_stats_raw(y, u, a, force))
+        yield (urls.roster, lambda y, force, u=urls.roster, a=team.safe_abbrev: get_roster_raw(y, u, a, force))
+
+def fetch_all(
+        year: int,
+        jobs: List[Tuple[str, Callable[[int, bool], str]]],
+        workers=DEFAULT_FETCH_WORKERS,
+        per_host=DEFAULT_HOST_CONCURRENCY,
+        force=False,
+        executor: Optional[Executor] = None,
+    ) -> List[str]:
+    reserve_pool(max(workers, per_host))
+    limiter = HostLimiter(per_host)
+    def run(job: Tuple[str, Callable[[int, bool], str]]) -> str:
+        url, raw_func = job
+        with limiter.get(url):
+            return raw_func(year, force)
+    if executor is not None:
+        return list(executor.map(run, jobs))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(run, jobs))
@@ -5,15 +5,17 @@ import urllib.parse
 
 from typing import Dict, List, Tuple
 
-from bs4 import BeautifulSoup
 from pydantic import BaseModel
 
-from bracket import Team
-from common import get_transform_typed, get_or_download_path
+from bracket import BRACKET_FILENAME, Team
+from common import get_transform_typed, get_or_download_path, raw_name
+from soup import make_soup
 
 STATS_HOME_URL = 'https://www.cbssports.com/college-basketball/teams/'
 STATS_HOME_FILENAME = 'stats_home.html'
 STATS_URLS_FILENAME = 'stats_urls.json'
+STATS_URLS_VERSION = 1
+STATS_HOME_REGIONS = ['TeamName']
 
 NAME_OVERRIDES = {
     'UConn': 'Connecticut Huskies',
@@ -45,6 +47,8 @@ def get_team_urls(
         load_func=TeamInfo,
         force_transform=force_transform,
         force_fetch=force_fetch,
+        inputs=[raw_name(STATS_HOME_FILENAME), BRACKET_FILENAME],
+        version=STATS_URLS_VERSION,
     )
 
 def parse_team_urls(path: str, teams: List[Team]) -> TeamInfo:
@@ -61,9 +65,8 @@ def find_url(team: Team, urls: List[Tuple[str, str]]) -> InfoUrls:
             return info
     raise Exception('Failed to find stats for team: {}'.format(team))
 
-def parse_urls(path: str) -> List[Tuple[str, InfoUrls]]:
-    with open(path) as file:
-        soup = BeautifulSoup(file, features='html.parser')
+def parse_urls(path: str, fast=True) -> List[Tuple[str, InfoUrls]]:
+    soup = make_soup(path, fast, STATS_HOME_REGIONS)
     team_names = soup.find_all(class_='TeamName')
     results = []
     for team_name in team_names:
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+
+import importlib
+import os.path
+import sys
+import threading
+import time
+
+from contextlib import contextmanager
+from types import ModuleType
+from typing import Callable, Dict, Iterator, List, Optional
+
+from pydantic import BaseModel
+
+REPORT_FILENAME = 'report.json'
+
+HIT = 'hit'
+MISS = 'miss'
+INVALIDATED = 'invalidated'
+FORCED = 'forced'
+FETCHED = 'fetched'
+NOT_MODIFIED = 'not_modified'
+LOAD_FAILED = 'load_failed'
+FAILED = 'failed'
+RUN = 'run'
+IMPORT_STAGE = 'import'
+
+class Event(BaseModel):
+    stage: str
+    name: str
+    outcome: str = RUN
+    seconds: float = 0
+    bytes: int = 0
+    error: Optional[str] = None
+
+class StageStats(BaseModel):
+    count: int = 0
+    seconds: float = 0
+    bytes: int = 0
+    failures: int = 0
+    outcomes: Dict[str, int] = {}
+
+class RunReport(BaseModel):
+    seconds: float
+    stages: Dict[str, StageStats]
+    events: List[Event]
+
+Listener = Callable[[Event], None]
+
+_events: List[Event] = []
+_listeners: List[Listener] = []
+_lock = threading.Lock()
+_started = time.perf_counter()
+
+def get_stage(name: str) -> str:
+    return name.split('/')[0].split('.')[0]
+
+@contextmanager
+def track(name: str, stage: Optional[str] = None) -> Iterator[Event]:
+    event = Event(stage=stage or get_stage(name), name=name)
+    start = time.perf_counter()
+    try:
+        yield event
+    finally:
+        event.seconds = time.perf_counter() - start
+        record(event)
+
+def record(event: Event):
+    with _lock:
+        _events.append(event)
+        listeners = list(_listeners)
+    for listener in listeners:
+        listener(event)
+
+def lazy_import(name: str) -> ModuleType:
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    with track(name, IMPORT_STAGE):
+        return importlib.import_module(name)
+
+def add_listener(listener: Listener):
+    with _lock:
+        _listeners.append(listener)
+
+def remove_listener(listener: Listener):
+    with _lock:
+        _listeners.remove(listener)
+
+def get_events() -> List[Event]:
+    with _lock:
+        return list(_events)
+
+def merge_events(events: List[Event]):
+    for event in events:
+        record(event)
+
+def reset():
+    global _started
+    with _lock:
+        _events.clear()
+        _started = time.perf_counter()
+
+def get_report() -> RunReport:
+    events = get_events()
+    stages = {}
+    for event in events:
+        stats = stages.setdefault(event.stage, StageStats())
+        stats.count += 1
+        stats.seconds += event.seconds
+        stats.bytes += event.bytes
+        stats.failures += 1 if event.error else 0
+        stats.outcomes[event.outcome] = stats.outcomes.get(event.outcome, 0) + 1
+    return RunReport(
+        seconds = time.perf_counter() - _started,
+        stages = stages,
+        events = events,
+    )
+
+def save_report(directory: str, report: Optional[RunReport] = None) -> str:
+    report = report or get_report()
+    path = os.path.join(directory, REPORT_FILENAME)
+    with open(path, 'w') as file:
+        file.write(report.json(indent=2))
+    return path
+
+def pretty_report(report: RunReport) -> str:
+    lines = ['{:<12} {:>6} {:>9} {:>12} {:>8}  {}'.format('stage', 'count', 'seconds', 'bytes', 'failures', 'outcomes')]
+    for name, stats in sorted(report.stages.items(), key=lambda s: -s[1].seconds):
+        outcomes = ', '.join('{} {}'.format(v, k) for k, v in sorted(stats.outcomes.items()))
+        lines.append('{:<12} {:>6} {:>9.3f} {:>12} {:>8}  {}'.format(
+            name, stats.count, stats.seconds, stats.bytes, stats.failures, outcomes,
+        ))
+    return '\n'.join(lines)
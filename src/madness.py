@@ -1,51 +1,150 @@
 #!/usr/bin/env python
 
+import argparse
+import cProfile
 import os.path
+import sys
+import time
+import traceback
+
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+_import_started = time.perf_counter()
 
 from common import DEFAULT_YEAR, data_dir_assert
-from bracket import Team, Bracket, get_bracket
-from summary import Summary, get_summary_for_team
-from stats import get_stats_for_team
-from roster import get_roster_for_team
-from home import get_team_urls, TeamInfo
+from instrument import FAILED, IMPORT_STAGE, RUN, Event, get_report, pretty_report, record, reset, save_report
+from storage import FILE_STORAGE, STORAGE_BACKENDS, set_storage_backend
+from bracket import Bracket, get_bracket
+from fetch import DEFAULT_FETCH_WORKERS
+from transform import check_failures, get_summaries_for_bracket
 from analysis import get_analysis
-from tourney import get_tourney_results, pretty_bracket
+from matchup import get_matchups
+from tourney import apply_actual_results, get_tourney_results
+from simulate import Simulation, get_simulation, get_win_probabilities, plan_bracket, pretty_odds, pretty_simulation
+from exact import ExactOdds, get_exact_odds, top_brackets
+from optimize import DEFAULT_FIELD, optimize_tourney
+from render import RENDER_EXTENSIONS, RENDER_FORMATS, TEXT_FORMAT, save_brackets
+from matchup import MatchupTable
 
-from typing import List
+from typing import Optional
 
-RESULTS_FILENAME = 'results.txt'
+IMPORT_SECONDS = time.perf_counter() - _import_started
+RESULTS_FORMAT = 'results.{}'
+TOP_BRACKETS_FORMAT = 'brackets.{}'
+OPTIMAL_FORMAT = 'optimal.{}'
+ODDS_FILENAME = 'odds.txt'
+EXACT_ODDS_FILENAME = 'exact_odds.txt'
 
 def main():
+    args = parse_args()
+    set_storage_backend(args.storage)
     print('Running tournament!')
-    year = DEFAULT_YEAR
+    profile = cProfile.Profile() if args.profile else None
+    if profile is not None:
+        profile.enable()
+    failed = []
+    with ThreadPoolExecutor(max_workers=args.fetch_workers) as downloads, \
+            ProcessPoolExecutor(max_workers=args.workers) as parsers:
+        for i, year in enumerate(args.years):
+            reset()
+            if i == 0:
+                record(Event(stage=IMPORT_STAGE, name=__name__, seconds=IMPORT_SECONDS))
+            try:
+                run_year(year, args, downloads, parsers)
+            except Exception as ex:
+                print('Failed to run {}: {}'.format(year, ex))
+                record(Event(stage=RUN, name=str(year), outcome=FAILED, error=traceback.format_exc()))
+                failed.append(year)
+            save_run_report(year, args.report)
+    if profile is not None:
+        profile.disable()
+        profile.dump_stats(args.profile)
+        print('Saved profile to {}'.format(args.profile))
+    if failed:
+        sys.exit('Failed years: {}'.format(', '.join(str(y) for y in failed)))
+    print('Done!')
+
+def run_year(
+    year: int,
+    args: argparse.Namespace,
+    downloads: Optional[Executor] = None,
+    parsers: Optional[Executor] = None,
+):
+    print('Running {}...'.format(year))
     bracket = get_bracket(year)
-    summaries = get_summaries_for_bracket(year, bracket)
+    summaries, failures = get_summaries_for_bracket(year, bracket, args.workers, args.force_transform, downloads, parsers, args.refresh)
+    check_failures(bracket, failures)
     analysis = get_analysis(year, summaries)
-    result = get_tourney_results(year, bracket, summaries, force_transform=True)
-    save_bracket(year, result)
-    print('Done!')
+    matchups = get_matchups(year, bracket, summaries)
+    played = apply_actual_results(year, bracket)
+    result = get_tourney_results(year, played, summaries, matchups)
+    save_bracket(year, result, args.format)
+    if args.optimize:
+        save_optimal(year, optimize_tourney(played, summaries, matchups, args.field, args.seed), args.format)
+    if args.exact:
+        save_exact_odds(year, get_exact_odds(year, played, summaries, matchups))
+    if args.simulations:
+        simulation = get_simulation(year, played, summaries, args.simulations, args.seed, matchups)
+        save_odds(year, simulation)
+    if args.top_brackets:
+        save_top_brackets(year, played, matchups, args)
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Predict March Madness tournament results.')
+    parser.add_argument('years', type=int, nargs='*', default=[DEFAULT_YEAR], help='tournament years to run')
+    parser.add_argument('--simulations', type=int, default=0, help='number of Monte Carlo brackets to simulate')
+    parser.add_argument('--optimize', action='store_true', help='also pick the bracket with the most expected points')
+    parser.add_argument('--field', type=int, default=DEFAULT_FIELD, help='number of simulated opponents to pick against when optimizing')
+    parser.add_argument('--exact', action='store_true', help='compute exact odds of reaching every round')
+    parser.add_argument('--top-brackets', type=int, default=0, help='number of most likely brackets to export')
+    parser.add_argument('--format', choices=RENDER_FORMATS, default=TEXT_FORMAT, help='format for exported brackets')
+    parser.add_argument('--seed', type=int, default=None, help='random seed for simulations')
+    parser.add_argument('--workers', type=int, default=None, help='number of processes for parsing team pages')
+    parser.add_argument('--fetch-workers', type=int, default=DEFAULT_FETCH_WORKERS, help='number of threads for downloading team pages')
+    parser.add_argument('--refresh', action='store_true', help='revalidate cached team pages with the server')
+    parser.add_argument('--force-transform', action='store_true', help='re-parse team pages even if cached')
+    parser.add_argument('--report', action='store_true', help='print per-stage timings and cache outcomes')
+    parser.add_argument('--profile', default=None, help='write cProfile stats for the whole run to this file')
+    parser.add_argument('--storage', choices=STORAGE_BACKENDS, default=FILE_STORAGE, help='where to cache parsed output')
+    return parser.parse_args()
+
+def save_bracket(year: int, result: Bracket, format=TEXT_FORMAT):
+    path = os.path.join(data_dir_assert(year), RESULTS_FORMAT.format(RENDER_EXTENSIONS[format]))
+    save_brackets(path, [('', result)], format, 'Results {}'.format(year))
 
-def save_bracket(year: int, result: Bracket):
-    pretty = pretty_bracket(result)
-    path = os.path.join(data_dir_assert(year), RESULTS_FILENAME)
+def save_optimal(year: int, optimal: Bracket, format=TEXT_FORMAT):
+    path = os.path.join(data_dir_assert(year), OPTIMAL_FORMAT.format(RENDER_EXTENSIONS[format]))
+    save_brackets(path, [('', optimal)], format, 'Optimal bracket {}'.format(year))
+
+def save_top_brackets(year: int, bracket: Bracket, matchups: MatchupTable, args: argparse.Namespace):
+    plan = plan_bracket(bracket)
+    probabilities = get_win_probabilities(plan, matchups)
+    brackets = top_brackets(bracket, plan, probabilities, args.top_brackets)
+    path = os.path.join(data_dir_assert(year), TOP_BRACKETS_FORMAT.format(RENDER_EXTENSIONS[args.format]))
+    save_brackets(
+        path,
+        (('#{} (probability {:.3g})'.format(i + 1, p), b) for i, (p, b) in enumerate(brackets)),
+        args.format,
+        'Top brackets {}'.format(year),
+    )
+
+def save_run_report(year: int, verbose=False):
+    report = get_report()
+    save_report(data_dir_assert(year), report)
+    if verbose:
+        print(pretty_report(report))
+
+def save_odds(year: int, simulation: Simulation):
+    pretty = pretty_simulation(simulation)
+    path = os.path.join(data_dir_assert(year), ODDS_FILENAME)
     with open(path, 'w') as file:
         print(pretty, file=file)
 
-def get_summaries_for_bracket(
-    year: int,
-    bracket: Bracket,
-) -> List[Summary]:
-    info = get_team_urls(year, bracket.teams.values())
-    return [get_summary(year, team, info) for team in bracket.teams.values()]
-
-def get_summary(
-    year: int,
-    team: Team,
-    info: TeamInfo,
-) -> Summary:
-    stats = get_stats_for_team(year, team, info)
-    roster = get_roster_for_team(year, team, info)
-    return get_summary_for_team(year, team, roster, stats)
+def save_exact_odds(year: int, odds: ExactOdds):
+    pretty = pretty_odds(odds.teams)
+    path = os.path.join(data_dir_assert(year), EXACT_ODDS_FILENAME)
+    with open(path, 'w') as file:
+        print(pretty, file=file)
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
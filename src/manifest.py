@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+
+import json
+
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, ValidationError
+
+from storage import MANIFEST_SUFFIX, FileStorage
+
+MANIFEST_FORMAT = '{}' + MANIFEST_SUFFIX
+
+class InputRecord(BaseModel):
+    size: int
+    mtime_ns: int
+    sha256: str
+
+class Manifest(BaseModel):
+    version: int
+    inputs: Dict[str, InputRecord]
+
+def load_manifest(storage: FileStorage, filename: str) -> Optional[Manifest]:
+    try:
+        return Manifest(**json.loads(storage.read(MANIFEST_FORMAT.format(filename))))
+    except (FileNotFoundError, PermissionError, json.JSONDecodeError, ValidationError):
+        return None
+
+def is_fresh(storage: FileStorage, filename: str, inputs: List[str], version: int) -> bool:
+    manifest = load_manifest(storage, filename)
+    if manifest is None or manifest.version != version:
+        return False
+    if not set(manifest.inputs.keys()) <= set(inputs):
+        return False
+    refreshed = {}
+    for name in inputs:
+        record = manifest.inputs.get(name)
+        stat = storage.stat(name)
+        if record is None or stat is None:
+            if record is not None or stat is not None:
+                return False
+            continue
+        if stat == (record.size, record.mtime_ns):
+            continue
+        if storage.sha256(name) != record.sha256:
+            return False
+        refreshed[name] = record.copy(update={'size': stat[0], 'mtime_ns': stat[1]})
+    if refreshed:
+        save_manifest(storage, filename, manifest.copy(update={'inputs': {**manifest.inputs, **refreshed}}))
+    return True
+
+def write_manifest(storage: FileStorage, filename: str, inputs: List[str], version: int):
+    records = {}
+    for name in inputs:
+        record = get_record(storage, name)
+        if record is not None:
+            records[name] = record
+    manifest = Manifest(
+        version = version,
+        inputs = records,
+    )
+    save_manifest(storage, filename, manifest)
+
+def save_manifest(storage: FileStorage, filename: str, manifest: Manifest):
+    storage.write(MANIFEST_FORMAT.format(filename), json.dumps(manifest.dict(), indent=2))
+
+def get_record(storage: FileStorage, name: str) -> Optional[InputRecord]:
+    stat = storage.stat(name)
+    if stat is None:
+        return None
+    size, mtime_ns = stat
+    return InputRecord(
+        size = size,
+        mtime_ns = mtime_ns,
+        sha256 = storage.sha256(name),
+    )
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+
+import numpy as np
+
+from analysis import SCORE_ATTRIBUTES, Score, ScoreCache, score_vectors, to_score
+from bracket import BRACKET_FILENAME, Bracket
+from summary import Summary, get_summary_files
+from common import get_transform_typed
+
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel
+
+MATCHUPS_FILENAME = 'matchups.json'
+MATCHUPS_VERSION = 1
+VOTE_ATTRIBUTES = ['strength', 'dexterity', 'constitution', 'intelligence', 'wisdom', 'charisma']
+TIEBREAK_ATTRIBUTE = 'power'
+ATTRIBUTE_ORDER = [SCORE_ATTRIBUTES.index(a) for a in VOTE_ATTRIBUTES + [TIEBREAK_ATTRIBUTE]]
+
+class MatchupTable(BaseModel):
+    team_ids: List[int]
+    positions: Dict[int, int]
+    locations: List[str]
+    scores: Dict[str, List[Score]]
+    margins: Dict[str, List[List[int]]]
+    winners: Dict[str, List[List[int]]]
+
+def get_matchups(
+        year: int,
+        bracket: Bracket,
+        summaries: List[Summary],
+        force_transform=False,
+    ) -> MatchupTable:
+    return get_transform_typed(
+        year=year,
+        filename=MATCHUPS_FILENAME,
+        raw_func=lambda y,force=False: None,
+        transform_func=lambda s: build_matchups(bracket, summaries),
+        load_func=MatchupTable,
+        force_transform=force_transform,
+        inputs=[BRACKET_FILENAME] + get_summary_files(summaries),
+        version=MATCHUPS_VERSION,
+    )
+
+def build_matchups(
+        bracket: Bracket, 
+        summaries: List[Summary],
+        cache: Optional[ScoreCache] = None,
+    ) -> MatchupTable:
+    lookup = {s.team.index:s for s in summaries}
+    team_ids = sorted(bracket.teams.keys())
+    teams = [lookup[t] for t in team_ids]
+    locations = sorted(set(m.location for m in bracket.matches.values()))
+    vectors = score_vectors(teams, locations, cache)
+    margins = {}
+    winners = {}
+    for location in locations:
+        margin, winner = compare_all(vectors[location][:, ATTRIBUTE_ORDER], team_ids)
+        margins[location] = margin.tolist()
+        winners[location] = winner.tolist()
+    return MatchupTable.construct(
+        team_ids = team_ids,
+        positions = {t:i for i, t in enumerate(team_ids)},
+        locations = locations,
+        scores = {l:[to_score(v) for v in vectors[l]] for l in locations},
+        margins = margins,
+        winners = winners,
+    )
+
+def score_matrix(scores: List[Score]) -> np.ndarray:
+    return np.array([score_vector(s) for s in scores])
+
+def score_vector(score: Score) -> List[int]:
+    return [getattr(score, a) for a in VOTE_ATTRIBUTES + [TIEBREAK_ATTRIBUTE]]
+
+def compare_all(scores: np.ndarray, team_ids: List[int]):
+    left = scores[:, None, :]
+    right = scores[None, :, :]
+    wins = (left[:, :, :-1] > right[:, :, :-1]).sum(axis=-1)
+    margin = 2 * wins - (scores.shape[1] - 1)
+    ids = np.array(team_ids)
+    left_ids = np.broadcast_to(ids[:, None], margin.shape)
+    right_ids = np.broadcast_to(ids[None, :], margin.shape)
+    left_wins = (margin > 0) | ((margin == 0) & (left[:, :, -1] >= right[:, :, -1]))
+    return margin, np.where(left_wins, left_ids, right_ids)
+
+def get_winner(table: MatchupTable, location: str, left: int, right: int) -> int:
+    return table.winners[location][table.positions[left]][table.positions[right]]
+
+def get_margin(table: MatchupTable, location: str, left: int, right: int) -> int:
+    return table.margins[location][table.positions[left]][table.positions[right]]
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+
+import numpy as np
+
+from bracket import Bracket
+from exact import win_distributions
+from matchup import MatchupTable, build_matchups
+from simulate import Plan, get_win_probabilities, plan_bracket, simulate_winners, to_bracket
+from summary import Summary
+from tourney import get_round_points
+from instrument import track
+
+from typing import Dict, List, Optional
+
+OPTIMIZE_STAGE = 'optimize'
+DEFAULT_FIELD = 0
+FIELD_LEVERAGE = 1.0
+
+def optimize_tourney(
+        bracket: Bracket,
+        summaries: List[Summary],
+        matchups: Optional[MatchupTable] = None,
+        field=DEFAULT_FIELD,
+        seed: Optional[int] = None,
+    ) -> Bracket:
+    plan = plan_bracket(bracket)
+    probabilities = get_win_probabilities(plan, matchups or build_matchups(bracket, summaries))
+    with track('optimize_tourney', OPTIMIZE_STAGE):
+        winners = win_distributions(plan, probabilities)
+        ownership = get_ownership(plan, probabilities, field, seed) if field else None
+        picks = optimize_picks(plan, get_pick_values(plan, winners, ownership))
+    return to_bracket(bracket, plan, picks)
+
+def get_ownership(plan: Plan, probabilities: np.ndarray, field: int, seed: Optional[int] = None) -> Dict[int, np.ndarray]:
+    num_teams = len(plan.team_ids)
+    opponents = simulate_winners(plan, probabilities, field, np.random.default_rng(seed)).astype(np.intp)
+    return {i:np.bincount(opponents[:, c], minlength=num_teams) / field for c, i in enumerate(plan.order)}
+
+def get_pick_values(
+        plan: Plan,
+        winners: Dict[int, np.ndarray],
+        ownership: Optional[Dict[int, np.ndarray]] = None,
+        leverage=FIELD_LEVERAGE,
+    ) -> Dict[int, np.ndarray]:
+    values = {i:get_round_points(plan.rounds[i], plan.main_round) * winners[i] for i in plan.order}
+    if ownership is not None:
+        values = {i:v * (1 - leverage * ownership[i]) for i, v in values.items()}
+    return values
+
+def optimize_picks(plan: Plan, values: Dict[int, np.ndarray]) -> np.ndarray:
+    num_teams = len(plan.team_ids)
+    best: Dict[int, np.ndarray] = {}
+    sides: Dict[int, List[np.ndarray]] = {}
+    for i in plan.order:
+        left, right = [best[f] if f >= 0 else leaf_value(num_teams, p) for f, p in zip(plan.feeders[i], plan.initial[i])]
+        total = np.maximum(left + right.max(), right + left.max()) + values[i]
+        if i in plan.decided:
+            total = np.where(np.arange(num_teams) == plan.decided[i], total, -np.inf)
+        best[i] = total
+        sides[i] = [left, right]
+    picks: Dict[int, int] = {}
+    for i in reversed(plan.order):
+        next_match = plan.next_match[i]
+        picks[i] = int(np.argmax(best[i])) if next_match is None else pick_side(plan, sides, picks, next_match, i)
+    return np.array([picks[i] for i in plan.order])
+
+def leaf_value(num_teams: int, position: int) -> np.ndarray:
+    value = np.full(num_teams, -np.inf)
+    value[position] = 0
+    return value
+
+def pick_side(plan: Plan, sides: Dict[int, List[np.ndarray]], picks: Dict[int, int], parent: int, index: int) -> int:
+    winner = picks[parent]
+    side = sides[parent][plan.feeders[parent].index(index)]
+    return winner if side[winner] > -np.inf else int(np.argmax(side))
+
+def expected_points(plan: Plan, winners: Dict[int, np.ndarray], picks: np.ndarray) -> float:
+    return float(sum(
+        get_round_points(plan.rounds[i], plan.main_round) * winners[i][p]
+        for i, p in zip(plan.order, picks.tolist())
+    ))
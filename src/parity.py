@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+
+import fnmatch
+import glob
+import os.path
+import sys
+
+from common import COMPRESSED_SUFFIX, DEFAULT_YEAR, data_dir, get_year_storage, raw_path, split_data_path
+from bracket import BRACKET_RAW_FILENAME, parse_raw_bracket
+from home import STATS_HOME_FILENAME, parse_urls
+from stats import STATS_TEAM_RAW_FORMAT, parse_stats
+from roster import ROSTER_TEAM_RAW_FORMAT, parse_roster
+
+from typing import Any, Callable, List, Tuple
+
+def main():
+    year = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_YEAR
+    mismatches = check_parity(year)
+    for path in mismatches:
+        print('Mismatch: {}'.format(path))
+    print('Checked parser parity for {}: {} mismatches'.format(year, len(mismatches)))
+    sys.exit(1 if mismatches else 0)
+
+def check_parity(year: int) -> List[str]:
+    return [path for path, parse in get_pages(year) if not is_parity(path, parse)]
+
+def get_pages(year: int) -> List[Tuple[str, Callable[..., Any]]]:
+    pages = [
+        (raw_path(year, BRACKET_RAW_FILENAME), parse_raw_bracket),
+        (raw_path(year, STATS_HOME_FILENAME), parse_urls),
+    ]
+    pages += [(p, parse_stats) for p in find_raw_paths(year, STATS_TEAM_RAW_FORMAT.format('*'))]
+    pages += [(p, parse_roster) for p in find_raw_paths(year, ROSTER_TEAM_RAW_FORMAT.format('*'))]
+    storage = get_year_storage(year)
+    return [(p, parse) for p, parse in pages if storage.exists(split_data_path(p)[1])]
+
+def find_raw_paths(year: int, pattern: str) -> List[str]:
+    root = data_dir(year)
+    names = set(os.path.relpath(p, root) for p in glob.glob(os.path.join(root, pattern)))
+    names |= set(os.path.relpath(p, root)[:-len(COMPRESSED_SUFFIX)] for p in glob.glob(os.path.join(root, pattern + COMPRESSED_SUFFIX)))
+    bundle = get_year_storage(year).bundle
+    if bundle is not None:
+        names |= set(n for n in bundle.files if fnmatch.fnmatch(n, pattern))
+        names |= set(n[:-len(COMPRESSED_SUFFIX)] for n in bundle.files if fnmatch.fnmatch(n, pattern + COMPRESSED_SUFFIX))
+    return [raw_path(year, n) for n in sorted(names)]
+
+def is_parity(path: str, parse: Callable[..., Any]) -> bool:
+    return parse(path, fast=False) == parse(path, fast=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+
+import html
+import json
+
+from functools import lru_cache
+from typing import IO, Iterable, Iterator, List, Tuple, Union
+
+from bracket import Bracket, Team, get_bracket_topology, get_topology
+
+TEXT_FORMAT = 'text'
+JSON_FORMAT = 'json'
+HTML_FORMAT = 'html'
+RENDER_FORMATS = [TEXT_FORMAT, JSON_FORMAT, HTML_FORMAT]
+RENDER_EXTENSIONS = {TEXT_FORMAT: 'txt', JSON_FORMAT: 'json', HTML_FORMAT: 'html'}
+WINNER_MARK = ' (+)'
+SEPARATOR = '-'*24
+CELL_WIDTH = 32
+SEPARATOR_SLOT = -1
+
+HTML_HEADER = '''<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{}</title>
+<style>
+body {{ font-family: sans-serif; font-size: 12px; }}
+.bracket {{ display: flex; margin-bottom: 32px; }}
+.round {{ display: flex; flex-direction: column; justify-content: space-around; width: 200px; }}
+.match {{ border: 1px solid #999; margin: 2px 8px; }}
+.team {{ padding: 2px 4px; }}
+.winner {{ font-weight: bold; background: #dfd; }}
+</style>
+</head>
+<body>
+'''
+HTML_FOOTER = '</body>\n</html>\n'
+
+Cell = Union[int, Tuple[int, int], None]
+
+def render_brackets(brackets: Iterable[Tuple[str, Bracket]], file: IO[str], format=TEXT_FORMAT, title='Brackets'):
+    if format == TEXT_FORMAT:
+        for i, (name, bracket) in enumerate(brackets):
+            if i:
+                file.write('\n')
+            if name:
+                file.write(name + '\n')
+            for line in render_text(bracket):
+                file.write(line + '\n')
+    elif format == JSON_FORMAT:
+        file.write('[')
+        for i, (name, bracket) in enumerate(brackets):
+            file.write('{}\n{{"title": {}, "bracket": {}}}'.format(',' if i else '', json.dumps(name), bracket.json()))
+        file.write('\n]\n')
+    elif format == HTML_FORMAT:
+        file.write(HTML_HEADER.format(html.escape(title)))
+        for name, bracket in brackets:
+            for line in render_html(name, bracket):
+                file.write(line + '\n')
+        file.write(HTML_FOOTER)
+    else:
+        raise Exception('Unknown format: {}'.format(format))
+
+def save_brackets(path: str, brackets: Iterable[Tuple[str, Bracket]], format=TEXT_FORMAT, title='Brackets'):
+    with open(path, 'w') as file:
+        render_brackets(brackets, file, format, title)
+
+def render_text(bracket: Bracket) -> Iterator[str]:
+    labels = {i:format_team(t) for i, t in bracket.teams.items()}
+    cells = {SEPARATOR_SLOT: SEPARATOR.ljust(CELL_WIDTH)}
+    for match in bracket.matches.values():
+        cells.update({
+            (match.index, slot): (labels[t] + (WINNER_MARK if match.winner == t else '')).ljust(CELL_WIDTH)
+            for slot, t in enumerate(match.teams)
+        })
+    blank = ''.ljust(CELL_WIDTH)
+    for row in get_layout(len(bracket.teams)):
+        line = ' '.join(cells[c] if c is not None else blank for c in row).strip()
+        if line:
+            yield line
+
+def format_team(team: Team) -> str:
+    return '({}) {}'.format(team.seed, team.name)
+
+@lru_cache(maxsize=None)
+def get_layout(num_teams: int) -> List[List[Cell]]:
+    topology = get_topology(num_teams)
+    rows: List[List[Cell]] = [[None] * topology.num_rounds for _ in range(topology.num_teams * 2)]
+    offset = 0
+    for round, count in enumerate(topology.matches_per_round):
+        depth = max(round - topology.main_round, 0)
+        buffer = (depth + 1) * depth
+        row = 0
+        for index in range(offset, offset + count):
+            row += buffer
+            for cell in [SEPARATOR_SLOT, (index, 0), (index, 1), SEPARATOR_SLOT]:
+                rows[row][round] = cell
+                row += 1
+            row += buffer
+        offset += count
+    return [r for r in rows if any(c is not None for c in r)]
+
+def render_html(name: str, bracket: Bracket) -> Iterator[str]:
+    topology = get_bracket_topology(bracket)
+    yield '<section>'
+    if name:
+        yield '<h2>{}</h2>'.format(html.escape(name))
+    yield '<div class="bracket">'
+    offset = 0
+    for count in topology.matches_per_round:
+        yield '<div class="round">'
+        for index in range(offset, offset + count):
+            match = bracket.matches[index]
+            yield '<div class="match">' + ''.join(
+                '<div class="team{}">{}</div>'.format(
+                    ' winner' if match.winner == t else '',
+                    html.escape(format_team(bracket.teams[t])),
+                )
+                for t in match.teams
+            ) + '</div>'
+        yield '</div>'
+        offset += count
+    yield '</div>'
+    yield '</section>'
@@ -1,16 +1,21 @@
 #!/usr/bin/env python
 
-from typing import Dict, List, Optional
+from typing import TYPE_CHECKING, Dict, List, Optional
 
-from bs4 import BeautifulSoup
 from home import TeamInfo
 from pydantic import BaseModel
 
 from bracket import Team
-from common import get_transform_typed, get_or_download_path
+from common import get_transform_typed, get_or_download_path, raw_name
+from soup import make_soup
+
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup
 
 ROSTER_TEAM_RAW_FORMAT = 'roster/{}.html'
 ROSTER_TEAM_FORMAT = 'roster/{}.json'
+ROSTER_VERSION = 1
+ROSTER_REGIONS = ['PageTitle-header', 'TableBase']
 
 class Injury(BaseModel):
     area: str
@@ -54,18 +59,22 @@ def get_roster_for_team(
         load_func=RosterPage,
         force_transform=force_transform,
         force_fetch=force_fetch,
+        inputs=get_roster_inputs(team),
+        version=ROSTER_VERSION,
     )
 
-def parse_roster(path: str):
-    with open(path) as file:
-        soup = BeautifulSoup(file, features='html.parser')
+def get_roster_inputs(team: Team) -> List[str]:
+    return [raw_name(ROSTER_TEAM_RAW_FORMAT.format(team.safe_abbrev))]
+
+def parse_roster(path: str, fast=True):
+    soup = make_soup(path, fast, ROSTER_REGIONS, canonical=True)
     return RosterPage(
         name = soup.find(class_='PageTitle-header').text.strip(),
         url = soup.find(rel='canonical')['href'],
         table = parse_table(soup.find(class_='TableBase')),
     )
 
-def parse_table(soup: BeautifulSoup) -> Table:
+def parse_table(soup: 'BeautifulSoup') -> Table:
     headers = soup.find_all(class_='TableBase-headTh')
     use_headers = headers[0:1] + headers[2:]
     return Table(
@@ -74,13 +83,13 @@ def parse_table(soup: BeautifulSoup) -> Table:
         rows = [parse_row(r) for r in soup.find_all(class_='TableBase-bodyTr')],
     )
 
-def parse_header(soup: BeautifulSoup, idx: int) -> HeaderColumn:
+def parse_header(soup: 'BeautifulSoup', idx: int) -> HeaderColumn:
     return HeaderColumn(
         index = idx,
         name = soup.text.strip(),
     )
 
-def parse_row(soup: BeautifulSoup) -> PlayerRow:
+def parse_row(soup: 'BeautifulSoup') -> PlayerRow:
     values = soup.find_all(class_='TableBase-bodyTd')
     use_values = values[0:1] + values[2:]
     return PlayerRow(
@@ -88,7 +97,7 @@ def parse_row(soup: BeautifulSoup) -> PlayerRow:
         values = [v.text.strip() for v in use_values],
     )
 
-def parse_player(soup: BeautifulSoup) -> Player:
+def parse_player(soup: 'BeautifulSoup') -> Player:
     tooltip = soup.find(class_='Tablebase-tooltipInner')
     return Player(
         name = soup.span.a.text.strip(),
@@ -0,0 +1,256 @@
+#!/usr/bin/env python
+
+import argparse
+import json
+import threading
+import time
+import traceback
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from pydantic import BaseModel
+
+from analysis import ScoreCache
+from bracket import BRACKET_FILENAME, Bracket
+from common import DEFAULT_YEAR, data_dir, get_year_storage
+from matchup import ATTRIBUTE_ORDER, MatchupTable, build_matchups, compare_all
+from render import render_text
+from storage import FileStorage
+from summary import SUMMARY_TEAM_FORMAT, Injury, Summary
+from tourney import ACTUAL_FILENAME, apply_actual_results, run_tourney
+from trusted import load_trusted
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8064
+RELOAD_INTERVAL = 1.0
+WHAT_IF_INJURY = 'what-if'
+
+Stamp = Optional[Tuple[int, int]]
+
+class QueryError(Exception):
+    pass
+
+class MatchupResult(BaseModel):
+    location: str
+    left: int
+    right: int
+    winner: int
+    margin: int
+
+class Season:
+    def __init__(self, year: int, reload_interval=RELOAD_INTERVAL):
+        self.year = year
+        self.reload_interval = reload_interval
+        self.storage = get_year_storage(year)
+        self.files = FileStorage(data_dir(year))
+        self.lock = threading.RLock()
+        self.cache = ScoreCache()
+        self.stamps: Dict[str, Stamp] = {}
+        self.checked = 0.0
+        self.bracket: Optional[Bracket] = None
+        self.played: Optional[Bracket] = None
+        self.summaries: Dict[int, Summary] = {}
+        self.matchups: Optional[MatchupTable] = None
+        self.results: Optional[Bracket] = None
+        self.reloads = 0
+        self.error: Optional[str] = None
+        self.reload(force=True)
+
+    def get_stamps(self, bracket: Bracket) -> Dict[str, Stamp]:
+        names = [SUMMARY_TEAM_FORMAT.format(t.safe_abbrev) for t in bracket.teams.values()]
+        stamps = {n:self.storage.stat(n) for n in [BRACKET_FILENAME] + names}
+        stamps[ACTUAL_FILENAME] = self.files.stat(ACTUAL_FILENAME)
+        return stamps
+
+    def reload(self, force=False) -> bool:
+        with self.lock:
+            now = time.monotonic()
+            if not force and now - self.checked < self.reload_interval:
+                return False
+            self.checked = now
+            try:
+                return self.load(force)
+            except Exception:
+                if force:
+                    raise
+                self.error = traceback.format_exc()
+                return False
+
+    def load(self, force=False) -> bool:
+        self.storage.refresh()
+        bracket = self.bracket
+        if force or self.storage.stat(BRACKET_FILENAME) != self.stamps.get(BRACKET_FILENAME):
+            bracket = load_trusted(Bracket, self.storage.read(BRACKET_FILENAME))
+        stamps = self.get_stamps(bracket)
+        changed = [n for n, s in stamps.items() if s != self.stamps.get(n)]
+        if not changed:
+            return False
+        if BRACKET_FILENAME in changed:
+            cache = ScoreCache()
+            summaries: Dict[int, Summary] = {}
+        else:
+            cache = self.cache.copy()
+            summaries = dict(self.summaries)
+        for team in bracket.teams.values():
+            name = SUMMARY_TEAM_FORMAT.format(team.safe_abbrev)
+            if name in changed or team.index not in summaries:
+                summaries[team.index] = load_trusted(Summary, self.storage.read(name))
+                cache.invalidate(team.index)
+        played = apply_actual_results(self.year, bracket)
+        matchups = build_matchups(bracket, list(summaries.values()), cache)
+        results = run_tourney(played, list(summaries.values()), matchups)
+        self.bracket = bracket
+        self.played = played
+        self.summaries = summaries
+        self.cache = cache
+        self.matchups = matchups
+        self.results = results
+        self.stamps = stamps
+        self.error = None
+        self.reloads += 1
+        return True
+
+    def find_team(self, key: str) -> Summary:
+        for index, summary in self.summaries.items():
+            if key in [str(index), summary.team.abbrev, summary.team.safe_abbrev, summary.team.name]:
+                return summary
+        raise QueryError('Unknown team: {}'.format(key))
+
+    def get_matchup(self, left: str, right: str, location: Optional[str] = None) -> MatchupResult:
+        with self.lock:
+            teams = [self.find_team(left), self.find_team(right)]
+            location = location or self.matchups.locations[0]
+            vectors = np.array([self.cache.score_vector(t, location) for t in teams])
+        ids = [t.team.index for t in teams]
+        margin, winner = compare_all(vectors[:, ATTRIBUTE_ORDER], ids)
+        return MatchupResult(
+            location = location,
+            left = ids[0],
+            right = ids[1],
+            winner = int(winner[0][1]),
+            margin = int(margin[0][1]),
+        )
+
+    def get_analysis(self, team: str, location: Optional[str] = None):
+        with self.lock:
+            return self.cache.score_team(self.find_team(team), location)
+
+    def get_bracket(self, injured: List[str]) -> Bracket:
+        with self.lock:
+            if not injured:
+                return self.results
+            bracket = self.bracket
+            played = self.played
+            summaries = dict(self.summaries)
+            cache = self.cache.copy()
+            indexes = [self.find_team(k.partition(':')[0]).team.index for k in injured]
+        for index, key in zip(indexes, injured):
+            player = key.partition(':')[2]
+            summary = summaries[index]
+            if player not in [p.name for p in summary.players]:
+                raise QueryError('Unknown player: {}'.format(key))
+            summaries[summary.team.index] = summary.copy(update={'players': [
+                p.copy(update={'injury': Injury(area=WHAT_IF_INJURY)}) if p.name == player else p
+                for p in summary.players
+            ]})
+            cache.invalidate(summary.team.index)
+        matchups = build_matchups(bracket, list(summaries.values()), cache)
+        return run_tourney(played, list(summaries.values()), matchups)
+
+def main():
+    args = parse_args()
+    season = Season(args.year, args.reload_interval)
+    server = make_server(season, args.host, args.port)
+    print('Serving {} on http://{}:{}'.format(args.year, args.host, server.server_address[1]))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Answer matchup, bracket and analysis queries from a warm cache.')
+    parser.add_argument('year', type=int, nargs='?', default=DEFAULT_YEAR, help='tournament year, already cached')
+    parser.add_argument('--host', default=DEFAULT_HOST, help='address to listen on')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='port to listen on, 0 for any')
+    parser.add_argument('--reload-interval', type=float, default=RELOAD_INTERVAL, help='seconds between checks for cache changes')
+    return parser.parse_args()
+
+def make_server(season: Season, host=DEFAULT_HOST, port=DEFAULT_PORT) -> ThreadingHTTPServer:
+    routes = get_routes(season)
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+            route = routes.get(url.path)
+            if route is None:
+                return self.send(404, {'error': 'Unknown path: {}'.format(url.path)})
+            try:
+                season.reload()
+                self.send(200, route(query))
+            except QueryError as ex:
+                self.send(400, {'error': str(ex)})
+            except Exception as ex:
+                self.send(500, {'error': '{}: {}'.format(type(ex).__name__, ex)})
+
+        def send(self, status: int, body: Any):
+            if isinstance(body, str):
+                payload, content_type = body.encode(), 'text/plain; charset=utf-8'
+            else:
+                payload, content_type = to_json(body).encode(), 'application/json'
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+    return ThreadingHTTPServer((host, port), Handler)
+
+def get_routes(season: Season) -> Dict[str, Callable[[Dict[str, List[str]]], Any]]:
+    def matchup(query):
+        return season.get_matchup(require(query, 'left'), require(query, 'right'), first(query, 'location'))
+    def analysis(query):
+        return season.get_analysis(require(query, 'team'), first(query, 'location'))
+    def bracket(query):
+        result = season.get_bracket(query.get('injured', []))
+        return '\n'.join(render_text(result)) + '\n' if first(query, 'format') == 'text' else result
+    def teams(query):
+        with season.lock:
+            summaries = list(season.summaries.values())
+        return [s.team for s in summaries]
+    def status(query):
+        with season.lock:
+            return {'year': season.year, 'reloads': season.reloads, 'teams': len(season.summaries), 'error': season.error}
+    return {
+        '/matchup': matchup,
+        '/analysis': analysis,
+        '/bracket': bracket,
+        '/teams': teams,
+        '/status': status,
+    }
+
+def first(query: Dict[str, List[str]], name: str) -> Optional[str]:
+    values = query.get(name)
+    return values[0] if values else None
+
+def require(query: Dict[str, List[str]], name: str) -> str:
+    value = first(query, name)
+    if value is None:
+        raise QueryError('Missing parameter: {}'.format(name))
+    return value
+
+def to_json(body: Any) -> str:
+    if isinstance(body, BaseModel):
+        return body.json()
+    if isinstance(body, list):
+        return '[' + ','.join(to_json(b) for b in body) + ']'
+    return json.dumps(body)
+
+if __name__ == '__main__':
+    main()
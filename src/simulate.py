@@ -0,0 +1,333 @@
+#!/usr/bin/env python
+
+import numpy as np
+
+from bracket import BRACKET_FILENAME, Bracket, Topology, get_bracket_topology, get_entrants
+from matchup import MATCHUPS_FILENAME, MatchupTable, build_matchups, score_matrix
+from tourney import ACTUAL_FILENAME, imply_results
+from summary import Summary
+from common import get_transform_typed
+from instrument import track
+
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+SIMULATION_FORMAT = 'simulation/{}_{}.json'
+SIMULATION_VERSION = 1
+DEFAULT_SIMULATIONS = 100000
+DEFAULT_CHUNK_SIZE = 1 << 17
+WIN_PROBABILITY_SCALE = 0.5
+TIEBREAK_MARGIN = 0.5
+POSITION_DTYPE = np.int8
+SIMULATE_STAGE = 'simulate'
+
+class TeamOdds(BaseModel):
+    index: int
+    name: str
+    seed: int
+    rounds: List[float]
+    champion: float
+
+class Simulation(BaseModel):
+    simulations: int
+    seed: Optional[int]
+    teams: List[TeamOdds]
+
+class Plan(BaseModel):
+    team_ids: List[int]
+    locations: List[str]
+    num_rounds: int
+    main_round: int
+    order: List[int]
+    location_index: Dict[int, int]
+    children: Dict[int, List[int]]
+    feeders: Dict[int, List[int]]
+    initial: Dict[int, List[int]]
+    rounds: Dict[int, int]
+    next_match: Dict[int, Optional[int]]
+    decided: Dict[int, int]
+
+class SimulationState:
+    def __init__(
+            self,
+            plan: Plan,
+            probabilities: np.ndarray,
+            simulations: int,
+            seed: Optional[int],
+            rng: np.random.Generator,
+            winners: Dict[int, np.ndarray],
+            counts: Dict[int, np.ndarray],
+        ):
+        self.plan = plan
+        self.probabilities = probabilities
+        self.simulations = simulations
+        self.seed = seed
+        self.rng = rng
+        self.winners = winners
+        self.counts = counts
+
+def get_simulation(
+        year: int,
+        bracket: Bracket,
+        summaries: List[Summary],
+        simulations=DEFAULT_SIMULATIONS,
+        seed: Optional[int] = None,
+        matchups: Optional[MatchupTable] = None,
+        force_transform=False,
+    ) -> Simulation:
+    if seed is None:
+        return simulate_tourney(bracket, summaries, simulations, seed, matchups)
+    return get_transform_typed(
+        year=year,
+        filename=SIMULATION_FORMAT.format(simulations, seed),
+        raw_func=lambda y,force=False: None,
+        transform_func=lambda s: simulate_tourney(bracket, summaries, simulations, seed, matchups),
+        load_func=Simulation,
+        force_transform=force_transform,
+        inputs=[BRACKET_FILENAME, MATCHUPS_FILENAME, ACTUAL_FILENAME],
+        version=SIMULATION_VERSION,
+    )
+
+def simulate_tourney(
+        bracket: Bracket,
+        summaries: List[Summary],
+        simulations=DEFAULT_SIMULATIONS,
+        seed: Optional[int] = None,
+        matchups: Optional[MatchupTable] = None,
+        chunk_size=DEFAULT_CHUNK_SIZE,
+    ) -> Simulation:
+    plan = plan_bracket(bracket)
+    probabilities = get_win_probabilities(plan, matchups or build_matchups(bracket, summaries))
+    with track('simulate_tourney', SIMULATE_STAGE):
+        counts = run_simulations(plan, probabilities, simulations, seed, chunk_size)
+    return to_simulation(bracket, plan, counts, simulations, seed)
+
+def to_simulation(
+        bracket: Bracket,
+        plan: Plan,
+        counts: np.ndarray,
+        simulations: int,
+        seed: Optional[int],
+    ) -> Simulation:
+    return Simulation(
+        simulations = simulations,
+        seed = seed,
+        teams = [
+            TeamOdds(
+                index = t,
+                name = bracket.teams[t].name,
+                seed = bracket.teams[t].seed,
+                rounds = [float(c) / simulations for c in counts[i, :-1]],
+                champion = float(counts[i, -1]) / simulations,
+            )
+            for i, t in enumerate(plan.team_ids)
+        ],
+    )
+
+def plan_bracket(bracket: Bracket) -> Plan:
+    team_ids = sorted(bracket.teams.keys())
+    position = {t:i for i, t in enumerate(team_ids)}
+    locations = sorted(set(m.location for m in bracket.matches.values()))
+    topology = get_bracket_topology(bracket)
+    order = sorted(bracket.matches.keys())
+    feeders = {i:list(topology.feeders[i]) for i in order}
+    children = {i:[f for f in feeders[i] if f >= 0] for i in order}
+    initial = {i:get_initial(bracket, topology, position, i) for i in order}
+    return Plan(
+        team_ids = team_ids,
+        locations = locations,
+        num_rounds = topology.num_rounds,
+        main_round = topology.main_round,
+        order = order,
+        location_index = {i:locations.index(bracket.matches[i].location) for i in order},
+        children = children,
+        feeders = feeders,
+        initial = initial,
+        rounds = {i:bracket.matches[i].round for i in order},
+        next_match = {i:bracket.matches[i].next_match_index for i in order},
+        decided = {i:position[w] for i, w in imply_results(bracket, topology).items()},
+    )
+
+def get_initial(bracket: Bracket, topology: Topology, position: Dict[int, int], index: int) -> List[int]:
+    return [-1 if e is None else position[e] for e in get_entrants(bracket, topology, index)]
+
+def get_win_probabilities(plan: Plan, matchups: MatchupTable) -> np.ndarray:
+    positions = [matchups.positions[t] for t in plan.team_ids]
+    scores = np.array([score_matrix(matchups.scores[l])[positions] for l in plan.locations])
+    return win_probability_matrix(scores)
+
+def win_probability_matrix(scores: np.ndarray) -> np.ndarray:
+    votes = scores[:, :, None, :-1] - scores[:, None, :, :-1]
+    margin = np.sign(votes).sum(axis=-1).astype(float)
+    power = np.sign(scores[:, :, None, -1] - scores[:, None, :, -1])
+    margin = np.where(margin == 0, power * TIEBREAK_MARGIN, margin)
+    return 1 / (1 + np.exp(-WIN_PROBABILITY_SCALE * margin))
+
+def run_simulations(
+        plan: Plan,
+        probabilities: np.ndarray,
+        simulations: int,
+        seed: Optional[int] = None,
+        chunk_size=DEFAULT_CHUNK_SIZE,
+    ) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    num_rounds = plan.num_rounds
+    counts = np.zeros((len(plan.team_ids), num_rounds + 1), dtype=np.int64)
+    done = 0
+    while done < simulations:
+        size = min(chunk_size, simulations - done)
+        counts += simulate_chunk(plan, probabilities, size, rng)
+        done += size
+    return counts
+
+def simulate_chunk(
+        plan: Plan,
+        probabilities: np.ndarray,
+        size: int,
+        rng: np.random.Generator,
+    ) -> np.ndarray:
+    num_teams = len(plan.team_ids)
+    num_rounds = plan.num_rounds
+    counts = np.zeros((num_teams, num_rounds + 1), dtype=np.int64)
+    winners: Dict[int, np.ndarray] = {}
+    for i in plan.order:
+        left, right = get_participants(plan, i, winners, size)
+        round = plan.rounds[i]
+        counts[:, round] += np.bincount(left, minlength=num_teams)
+        counts[:, round] += np.bincount(right, minlength=num_teams)
+        winners[i] = play_match(plan, probabilities, i, left, right, rng)
+        for child in plan.children[i]:
+            del winners[child]
+    for winner in winners.values():
+        counts[:, num_rounds] += np.bincount(winner, minlength=num_teams)
+    return counts
+
+def simulate_winners(
+        plan: Plan,
+        probabilities: np.ndarray,
+        size: int,
+        rng: np.random.Generator,
+    ) -> np.ndarray:
+    winners: Dict[int, np.ndarray] = {}
+    for i in plan.order:
+        left, right = get_participants(plan, i, winners, size)
+        winners[i] = play_match(plan, probabilities, i, left, right, rng).astype(POSITION_DTYPE)
+    return np.stack([winners[i] for i in plan.order], axis=1)
+
+def to_bracket(bracket: Bracket, plan: Plan, winners: np.ndarray) -> Bracket:
+    positions = dict(zip(plan.order, winners.tolist()))
+    matches = {}
+    for i in plan.order:
+        teams = [positions[f] if f >= 0 else p for f, p in zip(plan.feeders[i], plan.initial[i])]
+        matches[i] = bracket.matches[i].copy(update={
+            'teams': [plan.team_ids[p] for p in teams],
+            'winner': plan.team_ids[positions[i]],
+        })
+    final = [i for i in plan.order if plan.next_match[i] is None]
+    return bracket.copy(update={'matches': matches, 'winner': matches[final[0]].winner if final else None})
+
+def play_match(
+        plan: Plan,
+        probabilities: np.ndarray,
+        index: int,
+        left: np.ndarray,
+        right: np.ndarray,
+        rng: np.random.Generator,
+    ) -> np.ndarray:
+    if index in plan.decided:
+        return np.full(len(left), plan.decided[index], dtype=POSITION_DTYPE)
+    p = probabilities[plan.location_index[index], left, right]
+    return np.where(rng.random(len(left)) < p, left, right)
+
+def get_participants(
+        plan: Plan,
+        index: int,
+        winners: Dict[int, np.ndarray],
+        size: int,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+    left, right = [
+        winners[f] if f >= 0 else np.full(size, p, dtype=POSITION_DTYPE)
+        for f, p in zip(plan.feeders[index], plan.initial[index])
+    ]
+    return left, right
+
+def start_simulation(
+        bracket: Bracket,
+        summaries: List[Summary],
+        simulations=DEFAULT_SIMULATIONS,
+        seed: Optional[int] = None,
+        matchups: Optional[MatchupTable] = None,
+    ) -> SimulationState:
+    plan = plan_bracket(bracket)
+    state = SimulationState(
+        plan = plan,
+        probabilities = get_win_probabilities(plan, matchups or build_matchups(bracket, summaries)),
+        simulations = simulations,
+        seed = seed,
+        rng = np.random.default_rng(seed),
+        winners = {},
+        counts = {},
+    )
+    with track('start_simulation', SIMULATE_STAGE):
+        replay_matches(state, set(plan.order))
+    return state
+
+def update_simulation(state: SimulationState, bracket: Bracket) -> SimulationState:
+    plan = plan_bracket(bracket)
+    changed = set(
+        i for i in plan.order 
+        if plan.decided.get(i) != state.plan.decided.get(i) or plan.initial.get(i) != state.plan.initial.get(i)
+    )
+    dirty = set()
+    for i in changed:
+        while i is not None and i not in dirty:
+            dirty.add(i)
+            i = plan.next_match[i]
+    updated = SimulationState(
+        plan = plan,
+        probabilities = state.probabilities,
+        simulations = state.simulations,
+        seed = state.seed,
+        rng = np.random.default_rng(state.rng.bit_generator.jumped()),
+        winners = dict(state.winners),
+        counts = dict(state.counts),
+    )
+    with track('update_simulation', SIMULATE_STAGE):
+        replay_matches(updated, dirty)
+    return updated
+
+def replay_matches(state: SimulationState, dirty: set):
+    plan = state.plan
+    num_teams = len(plan.team_ids)
+    num_rounds = plan.num_rounds
+    for i in plan.order:
+        if i not in dirty:
+            continue
+        left, right = get_participants(plan, i, state.winners, state.simulations)
+        state.winners[i] = play_match(plan, state.probabilities, i, left, right, state.rng)
+        counts = np.zeros((num_teams, num_rounds + 1), dtype=np.int64)
+        counts[:, plan.rounds[i]] += np.bincount(left, minlength=num_teams)
+        counts[:, plan.rounds[i]] += np.bincount(right, minlength=num_teams)
+        if plan.next_match[i] is None:
+            counts[:, num_rounds] += np.bincount(state.winners[i], minlength=num_teams)
+        state.counts[i] = counts
+
+def count_state(state: SimulationState) -> np.ndarray:
+    return sum(state.counts[i] for i in state.plan.order)
+
+def get_state_odds(state: SimulationState, bracket: Bracket) -> Simulation:
+    return to_simulation(bracket, state.plan, count_state(state), state.simulations, state.seed)
+
+def pretty_simulation(simulation: Simulation) -> str:
+    return pretty_odds(simulation.teams)
+
+def pretty_odds(teams: List[TeamOdds]) -> str:
+    num_rounds = max([len(t.rounds) for t in teams] + [0])
+    header = ['Team'] + ['R{}'.format(r + 1) for r in range(num_rounds)] + ['Champ']
+    lines = ['{:<32}'.format(header[0]) + ''.join('{:>8}'.format(h) for h in header[1:])]
+    for team in sorted(teams, key=lambda t: (-t.champion, t.seed, t.name)):
+        name = '({}) {}'.format(team.seed, team.name)
+        odds = team.rounds + [team.champion]
+        lines.append('{:<32}'.format(name) + ''.join('{:>8.1%}'.format(o) for o in odds))
+    return '\n'.join(lines)
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+
+import argparse
+import hashlib
+import json
+import os
+import os.path
+import shutil
+import zipfile
+
+from typing import Dict, List, Optional, Tuple
+
+from common import COMPRESSED_SUFFIX, DEFAULT_YEAR, data_dir, data_dir_assert, get_year_storage
+from storage import BUNDLE_INDEX, BUNDLE_VERSION, SQLITE_FILENAME, Bundle, SqliteStorage, bundle_path, check_member_name
+
+EXPORT_COMMAND = 'export'
+IMPORT_COMMAND = 'import'
+TEMP_SUFFIX = '.tmp'
+
+Record = Tuple[int, int, str]
+
+def main():
+    args = parse_args()
+    if args.command == EXPORT_COMMAND:
+        path = export_bundle(args.year, args.output)
+        print('Exported {} to {}'.format(args.year, path))
+    else:
+        path = import_bundle(args.path, args.extract)
+        print('Imported {} to {}'.format(args.path, path))
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Pack a season's cache into one file, or install one.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    export = commands.add_parser(EXPORT_COMMAND, help='pack raw pages and parsed output into a bundle')
+    export.add_argument('year', type=int, nargs='?', default=DEFAULT_YEAR, help='tournament year')
+    export.add_argument('--output', default=None, help='bundle path, defaults to next to the data directory')
+    install = commands.add_parser(IMPORT_COMMAND, help='install a bundle so runs read from it')
+    install.add_argument('path', help='bundle to install')
+    install.add_argument('--extract', action='store_true', help='unpack into loose files instead')
+    return parser.parse_args()
+
+def export_bundle(year: int, output: Optional[str] = None) -> str:
+    root = data_dir(year)
+    output = output or bundle_path(root)
+    temp_path = output + TEMP_SUFFIX
+    records: Dict[str, Record] = {}
+    with zipfile.ZipFile(temp_path, 'w') as archive:
+        for name, path in find_files(root):
+            with open(path, 'rb') as file:
+                content = file.read()
+            stat = os.stat(path)
+            add_member(archive, name, content)
+            records[name] = (stat.st_size, stat.st_mtime_ns, hashlib.sha256(content).hexdigest())
+        storage = get_year_storage(year)
+        if isinstance(storage, SqliteStorage):
+            for name, (payload, sha256, updated_ns) in storage.load_all().items():
+                add_member(archive, name, payload.encode())
+                records[name] = (len(payload), updated_ns, sha256)
+        if storage.bundle is not None:
+            for name, record in storage.bundle.files.items():
+                if name not in records:
+                    add_member(archive, name, storage.bundle.read_bytes(name))
+                    records[name] = record
+        index = {'version': BUNDLE_VERSION, 'year': year, 'files': records}
+        archive.writestr(BUNDLE_INDEX, json.dumps(index), zipfile.ZIP_DEFLATED)
+    os.replace(temp_path, output)
+    return output
+
+def find_files(root: str) -> List[Tuple[str, str]]:
+    files = []
+    for directory, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(directory, name)
+            if name.endswith(TEMP_SUFFIX) or name.startswith(SQLITE_FILENAME):
+                continue
+            files.append((os.path.relpath(path, root).replace(os.sep, '/'), path))
+    return sorted(files)
+
+def add_member(archive: zipfile.ZipFile, name: str, content: bytes):
+    compression = zipfile.ZIP_STORED if name.endswith(COMPRESSED_SUFFIX) else zipfile.ZIP_DEFLATED
+    archive.writestr(name, content, compression)
+
+def import_bundle(path: str, extract=False) -> str:
+    bundle = Bundle(path)
+    root = data_dir_assert(bundle.year)
+    if not extract:
+        target = bundle_path(root)
+        shutil.copyfile(path, target)
+        return target
+    real_root = os.path.realpath(root)
+    for name, (_, mtime_ns, _) in bundle.files.items():
+        target = os.path.realpath(os.path.join(root, check_member_name(name)))
+        if os.path.commonpath([real_root, target]) != real_root:
+            raise Exception('Bundle member escapes {}: {!r}'.format(root, name))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, 'wb') as file:
+            file.write(bundle.read_bytes(name))
+        os.utime(target, ns=(mtime_ns, mtime_ns))
+    return root
+
+if __name__ == '__main__':
+    main()
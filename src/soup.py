@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Optional, Union
+
+from common import open_raw
+from instrument import lazy_import
+
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup
+
+SLOW_PARSER = 'html.parser'
+FAST_PARSER = 'lxml'
+
+def has_fast_parser() -> bool:
+    try:
+        import lxml
+        return True
+    except ImportError:
+        return False
+
+def make_soup(
+        path: str,
+        fast=True,
+        classes: Iterable[str] = (),
+        canonical=False,
+    ) -> 'BeautifulSoup':
+    bs4 = lazy_import('bs4')
+    with open_raw(path) as file:
+        if not fast or not has_fast_parser():
+            return bs4.BeautifulSoup(file, features=SLOW_PARSER)
+        strainer = bs4.SoupStrainer(region_filter(set(classes), canonical))
+        return bs4.BeautifulSoup(file, features=FAST_PARSER, parse_only=strainer)
+
+def region_filter(
+        classes: set,
+        canonical: bool,
+    ) -> Callable[[str, Optional[Dict[str, Union[str, list]]]], bool]:
+    def match(name: str, attrs: Optional[Dict[str, Union[str, list]]] = None) -> bool:
+        attrs = attrs or {}
+        if canonical and name == 'link' and 'canonical' in split_attr(attrs.get('rel')):
+            return True
+        return any(c in classes for c in split_attr(attrs.get('class')))
+    return match
+
+def split_attr(value: Union[str, list, None]) -> list:
+    if value is None:
+        return []
+    return value.split() if isinstance(value, str) else value
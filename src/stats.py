@@ -1,16 +1,21 @@
 #!/usr/bin/env python
 
-from typing import Dict, List
+from typing import TYPE_CHECKING, Dict, List
 
-from bs4 import BeautifulSoup
 from home import TeamInfo
 from pydantic import BaseModel
 
 from bracket import Team
-from common import get_transform_typed, get_or_download_path
+from common import get_transform_typed, get_or_download_path, raw_name
+from soup import make_soup
+
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup
 
 STATS_TEAM_RAW_FORMAT = 'stats/{}.html'
 STATS_TEAM_FORMAT = 'stats/{}.json'
+STATS_VERSION = 1
+STATS_REGIONS = ['PageTitle-header', 'TableBase']
 
 class Player(BaseModel):
     name: str
@@ -52,38 +57,42 @@ def get_stats_for_team(
         load_func=StatsPage,
         force_transform=force_transform,
         force_fetch=force_fetch,
+        inputs=get_stats_inputs(team),
+        version=STATS_VERSION,
     )
 
-def parse_stats(path: str):
-    with open(path) as file:
-        soup = BeautifulSoup(file, features='html.parser')
+def get_stats_inputs(team: Team) -> List[str]:
+    return [raw_name(STATS_TEAM_RAW_FORMAT.format(team.safe_abbrev))]
+
+def parse_stats(path: str, fast=True):
+    soup = make_soup(path, fast, STATS_REGIONS, canonical=True)
     return StatsPage(
         name = soup.find(class_='PageTitle-header').text.strip(),
         url = soup.find(rel='canonical')['href'],
         tables = [parse_table(t) for t in soup.find_all(class_='TableBase')],
     )
 
-def parse_table(soup: BeautifulSoup) -> Table:
+def parse_table(soup: 'BeautifulSoup') -> Table:
     return Table(
         name = soup.find(class_='TableBase-title').text.strip(),
         header = [parse_header(h, idx) for idx, h in enumerate(soup.find_all(class_='TableBase-headTh--number'))],
         rows = [parse_row(r) for r in soup.select('.TableBase-bodyTr:not(.TableBase-bodyTr--total)')],
     )
 
-def parse_header(soup: BeautifulSoup, idx: int) -> HeaderColumn:
+def parse_header(soup: 'BeautifulSoup', idx: int) -> HeaderColumn:
     return HeaderColumn(
         index = idx,
         name = soup.a.text.strip(),
         description = soup.div.text.strip(),
     )
 
-def parse_row(soup: BeautifulSoup) -> PlayerRow:
+def parse_row(soup: 'BeautifulSoup') -> PlayerRow:
     return PlayerRow(
         player = parse_player(soup.find(class_='CellPlayerName--long')),
         values = [v.text.strip() for v in soup.find_all(class_='TableBase-bodyTd--number')],
     )
 
-def parse_player(soup: BeautifulSoup) -> Player:
+def parse_player(soup: 'BeautifulSoup') -> Player:
     return Player(
         name = soup.span.a.text.strip(),
         position = soup.span.span.text.strip(),
@@ -0,0 +1,328 @@
+#!/usr/bin/env python
+
+import hashlib
+import json
+import os
+import os.path
+import sqlite3
+import threading
+import time
+import zipfile
+
+from pathlib import Path, PurePosixPath, PureWindowsPath
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from trusted import split_header
+
+STORAGE_ENV = 'MADNESS_STORAGE'
+FILE_STORAGE = 'files'
+SQLITE_STORAGE = 'sqlite'
+STORAGE_BACKENDS = [FILE_STORAGE, SQLITE_STORAGE]
+SQLITE_FILENAME = 'madness.sqlite'
+SQLITE_TIMEOUT = 30
+HASH_CHUNK_SIZE = 1 << 20
+MANIFEST_SUFFIX = '.manifest.json'
+BUNDLE_SUFFIX = '.bundle'
+BUNDLE_INDEX = 'bundle.json'
+BUNDLE_VERSION = 1
+
+SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS artifacts (
+        name TEXT PRIMARY KEY,
+        payload TEXT NOT NULL,
+        sha256 TEXT NOT NULL,
+        updated_ns INTEGER NOT NULL
+    )''',
+    '''CREATE TABLE IF NOT EXISTS teams (
+        team_index INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        abbrev TEXT NOT NULL,
+        seed INTEGER NOT NULL
+    )''',
+    '''CREATE TABLE IF NOT EXISTS players (
+        team_index INTEGER NOT NULL,
+        name TEXT NOT NULL,
+        position TEXT,
+        school_class TEXT,
+        hometown TEXT,
+        height_inches INTEGER,
+        weight_pounds INTEGER,
+        injury TEXT,
+        PRIMARY KEY (team_index, name)
+    )''',
+    '''CREATE TABLE IF NOT EXISTS player_stats (
+        team_index INTEGER NOT NULL,
+        name TEXT NOT NULL,
+        games_played INTEGER,
+        minutes_per_game REAL,
+        points_per_game REAL,
+        rebounds_per_game REAL,
+        assists_per_game REAL,
+        steals_per_game REAL,
+        blocks_per_game REAL,
+        PRIMARY KEY (team_index, name)
+    )''',
+    '''CREATE TABLE IF NOT EXISTS results (
+        match_index INTEGER PRIMARY KEY,
+        round INTEGER NOT NULL,
+        location TEXT NOT NULL,
+        left_team INTEGER,
+        right_team INTEGER,
+        winner INTEGER
+    )''',
+    'CREATE INDEX IF NOT EXISTS players_name ON players (name)',
+    'CREATE INDEX IF NOT EXISTS player_stats_points ON player_stats (points_per_game)',
+    'CREATE INDEX IF NOT EXISTS results_winner ON results (winner)',
+    'CREATE INDEX IF NOT EXISTS results_round ON results (round)',
+]
+
+def check_member_name(name: str) -> str:
+    parts = PurePosixPath(name).parts
+    if not parts or name.startswith('/') or '\\' in name or PureWindowsPath(name).drive or '..' in parts:
+        raise Exception('Unsafe bundle member: {!r}'.format(name))
+    return name
+
+class Bundle:
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.archive = zipfile.ZipFile(path)
+        index = json.loads(self.archive.read(BUNDLE_INDEX))
+        if index['version'] != BUNDLE_VERSION:
+            raise Exception('Unsupported bundle version {}: {}'.format(index['version'], path))
+        if not isinstance(index['year'], int):
+            raise Exception('Invalid bundle year {!r}: {}'.format(index['year'], path))
+        self.year: int = index['year']
+        self.files: Dict[str, Tuple[int, int, str]] = {check_member_name(n):tuple(r) for n, r in index['files'].items()}
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.files
+
+    def read_bytes(self, name: str) -> bytes:
+        if name not in self.files:
+            raise FileNotFoundError(name)
+        with self.lock:
+            return self.archive.read(name)
+
+    def stat(self, name: str) -> Optional[Tuple[int, int]]:
+        record = self.files.get(name)
+        return (record[0], record[1]) if record else None
+
+    def sha256(self, name: str) -> str:
+        return self.files[name][2]
+
+class FileStorage:
+    def __init__(self, root: str):
+        self.root = root
+        self.bundle = get_bundle(root)
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+    def exists(self, name: str) -> bool:
+        return os.path.isfile(self.path(name)) or self.in_bundle(name)
+
+    def in_bundle(self, name: str) -> bool:
+        return self.bundle is not None and name in self.bundle
+
+    def read(self, name: str) -> str:
+        if not os.path.isfile(self.path(name)) and self.in_bundle(name):
+            return self.bundle.read_bytes(name).decode()
+        with open(self.path(name)) as file:
+            return file.read()
+
+    def read_bytes(self, name: str) -> bytes:
+        if not os.path.isfile(self.path(name)) and self.in_bundle(name):
+            return self.bundle.read_bytes(name)
+        with open(self.path(name), 'rb') as file:
+            return file.read()
+
+    def write(self, name: str, text: str):
+        path = self.path(name)
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        temp_path = '{}.{}.{}.tmp'.format(path, os.getpid(), threading.get_ident())
+        with open(temp_path, 'w') as file:
+            file.write(text)
+        os.replace(temp_path, path)
+
+    def stat(self, name: str) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path(name))
+        except FileNotFoundError:
+            return self.bundle.stat(name) if self.bundle is not None else None
+        return (stat.st_size, stat.st_mtime_ns)
+
+    def sha256(self, name: str) -> str:
+        if not os.path.isfile(self.path(name)) and self.in_bundle(name):
+            return self.bundle.sha256(name)
+        digest = hashlib.sha256()
+        with open(self.path(name), 'rb') as file:
+            for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def refresh(self):
+        pass
+
+class SqliteStorage(FileStorage):
+    def __init__(self, root: str):
+        super().__init__(root)
+        Path(root).mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(
+            os.path.join(root, SQLITE_FILENAME),
+            timeout=SQLITE_TIMEOUT,
+            check_same_thread=False,
+        )
+        with self.connection:
+            for statement in SCHEMA:
+                self.connection.execute(statement)
+        self.rows = self.load_all()
+
+    def load_all(self) -> Dict[str, Tuple[str, str, int]]:
+        with self.lock:
+            cursor = self.connection.execute('SELECT name, payload, sha256, updated_ns FROM artifacts')
+            return {name: (payload, sha, updated) for name, payload, sha, updated in cursor}
+
+    def get_row(self, name: str) -> Optional[Tuple[str, str, int]]:
+        if name not in self.rows:
+            with self.lock:
+                row = self.connection.execute(
+                    'SELECT payload, sha256, updated_ns FROM artifacts WHERE name = ?', (name,)
+                ).fetchone()
+            if row is None:
+                return None
+            self.rows[name] = row
+        return self.rows[name]
+
+    def is_stored(self, name: str) -> bool:
+        return name.endswith('.json')
+
+    def exists(self, name: str) -> bool:
+        if not self.is_stored(name) or self.get_row(name) is None:
+            return super().exists(name)
+        return True
+
+    def read(self, name: str) -> str:
+        if not self.is_stored(name) or self.get_row(name) is None:
+            return super().read(name)
+        return self.get_row(name)[0]
+
+    def write(self, name: str, text: str):
+        if not self.is_stored(name):
+            return super().write(name, text)
+        row = (text, hashlib.sha256(text.encode()).hexdigest(), time.time_ns())
+        with self.lock, self.connection:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO artifacts (name, payload, sha256, updated_ns) VALUES (?, ?, ?, ?)',
+                (name,) + row,
+            )
+            index_artifact(self.connection, name, text)
+        self.rows[name] = row
+
+    def stat(self, name: str) -> Optional[Tuple[int, int]]:
+        row = self.get_row(name) if self.is_stored(name) else None
+        if row is None:
+            return super().stat(name)
+        return (len(row[0]), row[2])
+
+    def sha256(self, name: str) -> str:
+        row = self.get_row(name) if self.is_stored(name) else None
+        if row is None:
+            return super().sha256(name)
+        return row[1]
+
+    def refresh(self):
+        self.rows = self.load_all()
+
+    def query(self, sql: str, parameters: Iterable[Any] = ()) -> List[tuple]:
+        with self.lock:
+            return self.connection.execute(sql, tuple(parameters)).fetchall()
+
+def index_artifact(connection: sqlite3.Connection, name: str, text: str):
+    if name.endswith(MANIFEST_SUFFIX):
+        return
+    for prefix, indexer in INDEXERS:
+        if name.startswith(prefix):
+            indexer(connection, json.loads(split_header(text)[1]))
+
+def index_summary(connection: sqlite3.Connection, summary: Dict[str, Any]):
+    team = summary['team']
+    connection.execute(
+        'INSERT OR REPLACE INTO teams (team_index, name, abbrev, seed) VALUES (?, ?, ?, ?)',
+        (team['index'], team['name'], team['abbrev'], team['seed']),
+    )
+    connection.execute('DELETE FROM players WHERE team_index = ?', (team['index'],))
+    connection.execute('DELETE FROM player_stats WHERE team_index = ?', (team['index'],))
+    for player in summary['players']:
+        info = player['info']
+        injury = player['injury']
+        connection.execute(
+            'INSERT OR REPLACE INTO players VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (
+                team['index'], player['name'], info['position'], info['school_class'], info['hometown'],
+                info['height_inches'], info['weight_pounds'], injury['area'] if injury else None,
+            ),
+        )
+        stats = player['stats']
+        if stats is None:
+            continue
+        connection.execute(
+            'INSERT OR REPLACE INTO player_stats VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (
+                team['index'], player['name'],
+                stats['overall']['games_played'],
+                stats['overall']['minutes_per_game'],
+                stats['scoring']['points_per_game'],
+                stats['defense']['rebounds_per_game'],
+                stats['assists']['assists_per_game'],
+                stats['defense']['steals_per_game'],
+                stats['defense']['blocks_per_game'],
+            ),
+        )
+
+def index_results(connection: sqlite3.Connection, bracket: Dict[str, Any]):
+    connection.execute('DELETE FROM results')
+    for match in bracket['matches'].values():
+        teams = match['teams'] + [None, None]
+        connection.execute(
+            'INSERT INTO results VALUES (?, ?, ?, ?, ?, ?)',
+            (match['index'], match['round'], match['location'], teams[0], teams[1], match['winner']),
+        )
+
+INDEXERS: List[Tuple[str, Callable[[sqlite3.Connection, Dict[str, Any]], None]]] = [
+    ('summary/', index_summary),
+    ('tourney.json', index_results),
+]
+
+_storages: Dict[Tuple[str, str, int], FileStorage] = {}
+_storages_lock = threading.Lock()
+_bundles: Dict[Tuple[str, int], Optional[Bundle]] = {}
+_bundles_lock = threading.Lock()
+
+def bundle_path(root: str) -> str:
+    return os.path.normpath(root) + BUNDLE_SUFFIX
+
+def get_bundle(root: str) -> Optional[Bundle]:
+    path = bundle_path(root)
+    key = (path, os.getpid())
+    with _bundles_lock:
+        if key not in _bundles:
+            _bundles[key] = Bundle(path) if os.path.isfile(path) else None
+        return _bundles[key]
+
+def get_storage_backend() -> str:
+    return os.environ.get(STORAGE_ENV, FILE_STORAGE)
+
+def set_storage_backend(backend: str):
+    if backend not in STORAGE_BACKENDS:
+        raise Exception('Unknown storage backend: {}'.format(backend))
+    os.environ[STORAGE_ENV] = backend
+
+def get_storage(root: str) -> FileStorage:
+    backend = get_storage_backend()
+    key = (backend, root, os.getpid())
+    with _storages_lock:
+        if key not in _storages:
+            _storages[key] = SqliteStorage(root) if backend == SQLITE_STORAGE else FileStorage(root)
+        return _storages[key]
@@ -4,13 +4,14 @@ import stats
 import roster
 import bracket
 
-from typing import Callable, List, Optional
+from typing import Callable, Dict, List, NamedTuple, Optional
 
 from pydantic import BaseModel
 
 from common import get_transform_typed
 
 SUMMARY_TEAM_FORMAT = 'summary/{}.json'
+SUMMARY_VERSION = 1
 PLACEHOLDER_VALUE = '\u2014'
 INCHES_IN_FOOT = 12
 
@@ -76,6 +77,12 @@ class Summary(BaseModel):
     team: bracket.Team
     players: List[Player]
 
+class IndexedTable(NamedTuple):
+    lookup: Dict[str, int]
+    rows: Dict[str, List[str]]
+
+StatsIndex = Dict[str, IndexedTable]
+
 def get_summary_for_team(
         year: int, 
         team: bracket.Team, 
@@ -93,53 +100,76 @@ def get_summary_for_team(
         load_func=Summary,
         force_transform=force_transform,
         force_fetch=force_fetch,
+        inputs=get_summary_inputs(team),
+        version=SUMMARY_VERSION,
     )
 
+def get_summary_inputs(team: bracket.Team) -> List[str]:
+    return [
+        stats.STATS_TEAM_FORMAT.format(team.safe_abbrev),
+        roster.ROSTER_TEAM_FORMAT.format(team.safe_abbrev),
+    ]
+
+def get_summary_files(summaries: List[Summary]) -> List[str]:
+    return [SUMMARY_TEAM_FORMAT.format(s.team.safe_abbrev) for s in summaries]
+
 def get_info(
         team: bracket.Team, 
         roster: roster.RosterPage,
         stats: stats.StatsPage,
     ) -> Summary:
+    index = index_stats(stats)
+    header = {h.name:h.index for h in roster.table.header}
     return Summary(
         team = team,
-        players = [get_player(p, roster, stats) for p in roster.table.rows]
+        players = [get_player(p, header, index) for p in roster.table.rows]
+    )
+
+def index_stats(stats: stats.StatsPage) -> StatsIndex:
+    return {t.name:index_table(t) for t in stats.tables}
+
+def index_table(table: stats.Table) -> IndexedTable:
+    rows = {}
+    for row in table.rows:
+        rows.setdefault(row.player.name, row.values)
+    return IndexedTable(
+        lookup = {h.name:h.index for h in table.header},
+        rows = rows,
     )
 
 def get_player(
         player_row: roster.PlayerRow,
-        roster: roster.RosterPage,
-        stats: stats.StatsPage,
+        header: Dict[str, int],
+        stats: StatsIndex,
     ) -> Player:
     return Player(
         name = player_row.player.name,
-        info = convert_info(player_row, roster.table.header),
+        info = convert_info(player_row, header),
         stats = convert_stats(player_row.player.name, stats),
         injury = convert_injury(player_row.player.injury)
     )
 
-def convert_stats(name: str, stats: stats.StatsPage) -> Optional[PlayerStats]:
-    lookup = {t.name:t for t in stats.tables}
-    scoring = lookup['Player Stats - Scoring']
+def convert_stats(name: str, stats: StatsIndex) -> Optional[PlayerStats]:
+    scoring = stats['Player Stats - Scoring']
     overall = convert_overall_stats(name, scoring)
     if overall is None:
         return None
     return PlayerStats(
         overall = overall,
         scoring = convert_scoring_stats(name, scoring),
-        defense = convert_defense_stats(name, lookup['Player Stats - Defense']),
-        assists = convert_assists_stats(name, lookup['Player Stats - Assists/Turnovers']),
+        defense = convert_defense_stats(name, stats['Player Stats - Defense']),
+        assists = convert_assists_stats(name, stats['Player Stats - Assists/Turnovers']),
     )
 
-def get_lookup_func(name: str, stats: stats.Table) -> Callable[[str], str]: 
-    lookup = {h.name:h.index for h in stats.header}
-    input = next(filter(lambda row: row.player.name == name, stats.rows))
+def get_lookup_func(name: str, stats: IndexedTable) -> Callable[[str], str]: 
+    lookup = stats.lookup
+    values = stats.rows[name]
     def get_value(name: str) -> str:
-        return input.values[lookup[name]]
+        return values[lookup[name]]
     return get_value
 
-def convert_overall_stats(name: str, stats: stats.Table) -> Optional[OverallStats]:
-    input = next(filter(lambda row: row.player.name == name, stats.rows), None)
-    if input is None:
+def convert_overall_stats(name: str, stats: IndexedTable) -> Optional[OverallStats]:
+    if name not in stats.rows:
         return None
     get_value = get_lookup_func(name, stats)
     played = get_value('GP')
@@ -151,7 +181,7 @@ def convert_overall_stats(name: str, stats: stats.Table) -> Optional[OverallStat
         minutes_per_game = get_value('MPG'),
     )
 
-def convert_scoring_stats(name: str, stats: stats.Table) -> ScoringStats:
+def convert_scoring_stats(name: str, stats: IndexedTable) -> ScoringStats:
     get_value = get_lookup_func(name, stats)
     return ScoringStats(
         points_per_game = get_value('PPG'),
@@ -166,7 +196,7 @@ def convert_scoring_stats(name: str, stats: stats.Table) -> ScoringStats:
         free_throw_percentage = none_if_placeholder(get_value('FT%')),
     )
 
-def convert_defense_stats(name: str, stats: stats.Table) -> DefenseStats:
+def convert_defense_stats(name: str, stats: IndexedTable) -> DefenseStats:
     get_value = get_lookup_func(name, stats)
     return DefenseStats(
         offensive_rebounds = get_value('OREB'),
@@ -179,7 +209,7 @@ def convert_defense_stats(name: str, stats: stats.Table) -> DefenseStats:
         blocks_per_game = get_value('BPG'),
     )
 
-def convert_assists_stats(name: str, stats: stats.Table) -> AssistsStats:
+def convert_assists_stats(name: str, stats: IndexedTable) -> AssistsStats:
     get_value = get_lookup_func(name, stats)
     return AssistsStats(
         total_assists = get_value('AST'),
@@ -189,8 +219,7 @@ def convert_assists_stats(name: str, stats: stats.Table) -> AssistsStats:
         assists_per_turnover = none_if_placeholder(get_value('A/TO')),
     )
 
-def convert_info(input: roster.PlayerRow, header: List[roster.HeaderColumn]) -> PlayerInfo:
-    lookup = {h.name:h.index for h in header}
+def convert_info(input: roster.PlayerRow, lookup: Dict[str, int]) -> PlayerInfo:
     def get_value(name: str) -> str:
         return input.values[lookup[name]]
     height = none_if_placeholder(get_value('HT'))
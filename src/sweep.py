@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+
+import argparse
+import os
+import os.path
+
+import numpy as np
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel
+
+from analysis import (
+    DEFAULT_HEIGHT_INCHES, DEFAULT_PERCENTAGE, DEFAULT_WEIGHT_POUNDS, HOMETOWN_MULTIPLIER, INJURY_PENALTY, INTELLIGENCE_SCORES,
+    Features, get_features, score_locations, score_players,
+)
+from bracket import Bracket, get_bracket
+from common import DEFAULT_YEAR, data_dir_assert
+from matchup import VOTE_ATTRIBUTES
+from simulate import Plan, plan_bracket
+from summary import Summary
+from tourney import clear_results, get_actual_results, get_round_points
+from transform import check_failures, get_summaries_for_bracket
+
+SWEEP_FILENAME = 'sweep.json'
+DEFAULT_CONFIGS = 1000
+DEFAULT_SPREAD = 0.5
+DEFAULT_CHUNK_SIZE = 256
+DEFAULT_TOP = 10
+REFERENCE_ACTUAL = 'actual'
+REFERENCE_DEFAULT = 'default'
+
+class Weights(BaseModel):
+    default_percentage: float = DEFAULT_PERCENTAGE
+    default_height_inches: float = DEFAULT_HEIGHT_INCHES
+    default_weight_pounds: float = DEFAULT_WEIGHT_POUNDS
+    injury_penalty: float = INJURY_PENALTY
+    hometown_multiplier: float = HOMETOWN_MULTIPLIER
+    intelligence: List[float] = INTELLIGENCE_SCORES
+    votes: List[float] = [1.0] * len(VOTE_ATTRIBUTES)
+
+class SweepResult(BaseModel):
+    weights: Weights
+    points: int
+    correct: int
+    champion: bool
+
+class SweepResults(BaseModel):
+    reference: str
+    configs: int
+    results: List[SweepResult]
+
+def main():
+    args = parse_args()
+    bracket = get_bracket(args.year)
+    summaries, failures = get_summaries_for_bracket(args.year, bracket, args.workers)
+    check_failures(bracket, failures)
+    weights = sample_weights(args.configs, args.seed, args.spread)
+    results = run_sweep(args.year, bracket, summaries, weights, args.workers)
+    path = os.path.join(data_dir_assert(args.year), SWEEP_FILENAME)
+    with open(path, 'w') as file:
+        file.write(results.json(indent=2))
+    print(pretty_sweep(results, args.top))
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Rank scoring constants and vote weights against a bracket.')
+    parser.add_argument('year', type=int, nargs='?', default=DEFAULT_YEAR, help='tournament year')
+    parser.add_argument('--configs', type=int, default=DEFAULT_CONFIGS, help='number of configurations to try')
+    parser.add_argument('--seed', type=int, default=None, help='random seed for sampling configurations')
+    parser.add_argument('--spread', type=float, default=DEFAULT_SPREAD, help='how far sampled constants stray from the defaults')
+    parser.add_argument('--workers', type=int, default=None, help='number of processes to evaluate configurations')
+    parser.add_argument('--top', type=int, default=DEFAULT_TOP, help='number of configurations to print')
+    return parser.parse_args()
+
+def run_sweep(
+        year: int,
+        bracket: Bracket,
+        summaries: List[Summary],
+        weights: List[Weights],
+        workers: Optional[int] = None,
+        chunk_size=DEFAULT_CHUNK_SIZE,
+    ) -> SweepResults:
+    plan = plan_bracket(clear_results(bracket))
+    features = get_plan_features(plan, summaries)
+    actual = get_actual_results(year)
+    if actual is not None:
+        reference = {i:plan.team_ids.index(t) for i, t in actual.winners.items()}
+    else:
+        reference = dict(zip(plan.order, predict(plan, features, [Weights()])[0]))
+    chunks = [weights[i:i+chunk_size] for i in range(0, len(weights), chunk_size)]
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(chunks) <= 1:
+        outcomes = [evaluate(plan, features, reference, c) for c in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            outcomes = list(executor.map(evaluate, *zip(*[(plan, features, reference, c) for c in chunks])))
+    results = [r for outcome in outcomes for r in outcome]
+    return SweepResults(
+        reference = REFERENCE_ACTUAL if actual is not None else REFERENCE_DEFAULT,
+        configs = len(weights),
+        results = sorted(results, key=lambda r: (-r.points, -r.correct)),
+    )
+
+def sample_weights(count: int, seed: Optional[int] = None, spread=DEFAULT_SPREAD) -> List[Weights]:
+    rng = np.random.default_rng(seed)
+    default = Weights()
+    weights = [default]
+    for _ in range(count - 1):
+        def vary(value: float, size: Optional[int] = None) -> List[float]:
+            return (np.asarray(value) * rng.uniform(1 - spread, 1 + spread, size)).tolist()
+        weights.append(Weights(
+            default_percentage = vary(default.default_percentage),
+            default_height_inches = vary(default.default_height_inches),
+            default_weight_pounds = vary(default.default_weight_pounds),
+            injury_penalty = vary(default.injury_penalty),
+            hometown_multiplier = vary(default.hometown_multiplier),
+            intelligence = vary(default.intelligence, len(default.intelligence)),
+            votes = vary(default.votes, len(default.votes)),
+        ))
+    return weights
+
+def get_plan_features(plan: Plan, summaries: List[Summary]) -> Features:
+    lookup = {s.team.index:s for s in summaries}
+    return get_features([lookup[t] for t in plan.team_ids])
+
+def evaluate(
+        plan: Plan,
+        features: Features,
+        reference: Dict[int, int],
+        weights: List[Weights],
+    ) -> List[SweepResult]:
+    predicted = predict(plan, features, weights)
+    order = [i for i in plan.order if i in reference]
+    columns = [plan.order.index(i) for i in order]
+    hits = predicted[:, columns] == np.array([reference[i] for i in order])
+    values = np.array([get_round_points(plan.rounds[i], plan.main_round) for i in order])
+    final = [c for c, i in zip(columns, order) if plan.next_match[i] is None]
+    champion = hits[:, [columns.index(c) for c in final]].all(axis=1) if final else np.zeros(len(weights), dtype=bool)
+    return [
+        SweepResult(
+            weights = w,
+            points = int(p),
+            correct = int(c),
+            champion = bool(h),
+        )
+        for w, p, c, h in zip(weights, hits @ values, hits.sum(axis=1), champion)
+    ]
+
+def predict(plan: Plan, features: Features, weights: List[Weights]) -> np.ndarray:
+    scores = score_configs(features, weights, plan.locations)
+    votes = np.array([w.votes for w in weights])
+    configs = np.arange(len(weights))
+    winners: Dict[int, np.ndarray] = {}
+    for i in plan.order:
+        left, right = [
+            winners[f] if f >= 0 else np.full(len(weights), p)
+            for f, p in zip(plan.feeders[i], plan.initial[i])
+        ]
+        location = plan.location_index[i]
+        left_scores = scores[configs, location, left]
+        right_scores = scores[configs, location, right]
+        sides = np.where(left_scores[:, :-1] > right_scores[:, :-1], 1, -1)
+        vote = (votes * sides).sum(axis=1)
+        left_wins = (vote > 0) | ((vote == 0) & (left_scores[:, -1] >= right_scores[:, -1]))
+        winners[i] = np.where(left_wins, left, right)
+    return np.stack([winners[i] for i in plan.order], axis=1)
+
+def score_configs(features: Features, weights: List[Weights], locations: List[str]) -> np.ndarray:
+    def column(name: str) -> np.ndarray:
+        return np.array([getattr(w, name) for w in weights])[:, None, None]
+    players = score_players(
+        features,
+        percentage = column('default_percentage'),
+        height_inches = column('default_height_inches'),
+        weight_pounds = column('default_weight_pounds'),
+        injury_penalty = column('injury_penalty'),
+        intelligence = np.array([w.intelligence for w in weights]),
+    )
+    return np.stack(score_locations(players, locations, column('hometown_multiplier')), axis=1)
+
+def pretty_sweep(results: SweepResults, top=DEFAULT_TOP) -> str:
+    lines = ['Ranked {} configurations against {} results'.format(results.configs, results.reference)]
+    lines.append('{:>4} {:>6} {:>7} {:>8}  {}'.format('rank', 'points', 'correct', 'champion', 'weights'))
+    for rank, r in enumerate(results.results[:top]):
+        lines.append('{:>4} {:>6} {:>7} {:>8}  {}'.format(rank + 1, r.points, r.correct, 'yes' if r.champion else 'no', r.weights.json()))
+    return '\n'.join(lines)
+
+if __name__ == '__main__':
+    main()
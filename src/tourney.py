@@ -1,59 +1,137 @@
 
-from tkinter import SEPARATOR
-from bracket import Team, Bracket, Match, EXPECTED_MATCHES_PER_ROUND, EXPECTED_NUM_TEAMS
-from summary import Summary
-from common import get_transform_typed
+import os.path
+
+from bracket import Team, Bracket, Match, BRACKET_FILENAME, Topology, get_bracket_topology, get_entrants
+from summary import Summary, get_summary_files
+from common import data_dir, get_transform_typed
 from analysis import Score, TeamScore, score_teams
+from matchup import MATCHUPS_FILENAME, MatchupTable, build_matchups, get_matchups, get_winner
+from render import render_text
+
+from typing import Dict, List, Optional
 
-from typing import Dict, List
+from pydantic import BaseModel
 
 TOURNEY_FILENAME = 'tourney.json'
+TOURNEY_VERSION = 3
+ACTUAL_FILENAME = 'actual.json'
+ROUND_POINTS = 10
+
+class ActualResults(BaseModel):
+    winners: Dict[int, int]
+
+def get_actual_results(year: int) -> Optional[ActualResults]:
+    path = os.path.join(data_dir(year), ACTUAL_FILENAME)
+    if not os.path.isfile(path):
+        return None
+    return ActualResults.parse_file(path)
+
+def apply_actual_results(year: int, bracket: Bracket) -> Bracket:
+    actual = get_actual_results(year)
+    return record_results(bracket, actual.winners) if actual else bracket
 
 def get_tourney_results(
         year: int, 
         bracket: Bracket, 
         summaries: List[Summary],
+        matchups: Optional[MatchupTable] = None,
         force_transform=False, 
     ) -> Bracket:
     return get_transform_typed(
         year=year, 
         filename=TOURNEY_FILENAME,
         raw_func=lambda y,force=False: None,
-        transform_func=lambda s: run_tourney(bracket, summaries),
+        transform_func=lambda s: run_tourney(
+            bracket, 
+            summaries, 
+            matchups or get_matchups(year, bracket, summaries, force_transform=force_transform),
+        ),
         load_func=Bracket,
         force_transform=force_transform,
+        inputs=[BRACKET_FILENAME, MATCHUPS_FILENAME, ACTUAL_FILENAME] + get_summary_files(summaries),
+        version=TOURNEY_VERSION,
     )
 
-def run_tourney(bracket: Bracket, summaries: List[Summary]) -> Bracket:
-    matches = bracket.matches.copy()
+def run_tourney(
+        bracket: Bracket, 
+        summaries: List[Summary], 
+        matchups: Optional[MatchupTable] = None,
+    ) -> Bracket:
     teams = {s.team.index:s for s in summaries}
+    matchups = matchups or build_matchups(bracket, summaries)
+    topology = get_bracket_topology(bracket)
+    bracket = record_results(bracket, imply_results(bracket, topology))
+    matches = {}
     overall_winner = None
     final_score = None
-    for match in matches.values():
-        winner = play_match(match, teams)
-        match.winner = winner
-        if match.next_match_index:
-            next_match = matches[match.next_match_index]
-            next_match.teams.append(winner)
-        else:
-            overall_winner = winner
+    for index in sorted(bracket.matches.keys()):
+        match = with_entrants(bracket, topology, index, matches)
+        if match.winner is None:
+            match = match.copy(update={'winner': play_match(match, matchups)})
+        matches[index] = match
+        if match.next_match_index is None:
+            overall_winner = match.winner
             final_score = get_final_score(match, teams)
-    return Bracket(
+    return Bracket.construct(
         matches = matches,
         teams = bracket.teams,
         winner = overall_winner,
         final_score = final_score,
     )
 
+def with_entrants(bracket: Bracket, topology: Topology, index: int, matches: Dict[int, Match]) -> Match:
+    match = bracket.matches[index]
+    feeders = topology.feeders[index]
+    if all(f < 0 for f in feeders):
+        return match
+    entrants = get_entrants(bracket, topology, index)
+    return with_teams(match, [matches[f].winner if f >= 0 else e for f, e in zip(feeders, entrants)])
+
+def with_teams(match: Match, teams: List[int]) -> Match:
+    if match.teams == teams:
+        return match
+    winner = match.winner if match.winner in teams else None
+    return match.copy(update={'teams': teams, 'winner': winner})
+
+def imply_results(bracket: Bracket, topology: Topology) -> Dict[int, int]:
+    order = sorted(bracket.matches.keys())
+    subtree: Dict[int, set] = {}
+    for i in order:
+        entrants = set(e for e in get_entrants(bracket, topology, i) if e is not None)
+        subtree[i] = entrants.union(*(subtree[f] for f in topology.feeders[i] if f >= 0))
+    implied = {i:m.winner for i, m in bracket.matches.items() if m.winner is not None}
+    for i in reversed(order):
+        if i not in implied:
+            continue
+        for f in topology.feeders[i]:
+            if f >= 0 and implied[i] in subtree[f]:
+                implied.setdefault(f, implied[i])
+    return implied
+
+def record_results(bracket: Bracket, results: Dict[int, int]) -> Bracket:
+    matches = dict(bracket.matches)
+    for index, winner in results.items():
+        if matches[index].winner != winner:
+            matches[index] = matches[index].copy(update={'winner': winner})
+    return bracket.copy(update={'matches': matches})
+
+def clear_results(bracket: Bracket) -> Bracket:
+    matches = {i:m.copy(update={'winner': None}) for i, m in bracket.matches.items()}
+    return bracket.copy(update={'matches': matches, 'winner': None, 'final_score': None})
+
+def get_round_points(round: int, main_round=0) -> int:
+    if round < main_round:
+        return 0
+    return ROUND_POINTS * 2 ** (round - main_round)
+
 def get_final_score(match: Match, teams: Dict[int, Summary]) -> List[int]:
-    return [get_score(teams[t]) for t in match.teams]
+    return [int(get_score(teams[t])) for t in match.teams]
 
 def get_score(summary: Summary):
     return sum([p.stats.scoring.points_per_game for p in summary.players if p.stats])
 
-def play_match(match: Match, teams: Dict[int, Summary]):
-    analysis = score_teams([teams[t] for t in match.teams], match.location)
-    return choose_winner(analysis.teams[0], analysis.teams[1]).index
+def play_match(match: Match, matchups: MatchupTable) -> int:
+    return get_winner(matchups, match.location, match.teams[0], match.teams[1])
 
 def choose_winner(left: TeamScore, right: TeamScore) -> TeamScore:
     counter = 0
@@ -73,31 +151,5 @@ def choose_winner(left: TeamScore, right: TeamScore) -> TeamScore:
         return right
 
 def pretty_bracket(bracket: Bracket) -> str:
-    rows = EXPECTED_NUM_TEAMS*2
-    cols = len(EXPECTED_MATCHES_PER_ROUND)
-    grid = [['']*cols for i in range(rows)]
-    row = 0
-    previous_round = None
-    WINNER_MARK = ' (+)'
-    SEPARATOR = '-'*24
-    for match in bracket.matches.values():
-        if previous_round != match.round:
-            previous_round = match.round
-            row = 0
-        buffer = (match.round+1) * match.round
-        row += buffer
-        grid[row][match.round] = SEPARATOR
-        row += 1
-        team_0 = bracket.teams[match.teams[0]]
-        team_1 = bracket.teams[match.teams[1]]
-        grid[row][match.round] = '({}) {}'.format(team_0.seed, team_0.name) + (WINNER_MARK if match.winner == match.teams[0] else '')
-        row += 1
-        grid[row][match.round] = '({}) {}'.format(team_1.seed, team_1.name) + (WINNER_MARK if match.winner == match.teams[1] else '')
-        row += 1
-        grid[row][match.round] = SEPARATOR
-        row += 1
-        row += buffer
-    joined_rows = [' '.join(['{:<32}'.format(c) for c in r]).strip() for r in grid]
-    result = '\n'.join(r for r in joined_rows if r)
-    return result
+    return '\n'.join(render_text(bracket))
         
\ No newline at end of file
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+
+import os
+import traceback
+
+from concurrent.futures import Executor, ProcessPoolExecutor, as_completed
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from bracket import Bracket, Team
+from common import get_year_storage, is_cached
+from fetch import fetch_team_pages
+from home import TeamInfo, get_team_urls
+from instrument import FAILED, Event, get_events, get_stage, merge_events, record, reset
+from roster import ROSTER_TEAM_FORMAT, ROSTER_VERSION, get_roster_for_team, get_roster_inputs
+from stats import STATS_TEAM_FORMAT, STATS_VERSION, get_stats_for_team, get_stats_inputs
+from summary import SUMMARY_TEAM_FORMAT, SUMMARY_VERSION, Summary, get_summary_for_team, get_summary_inputs
+
+class TransformResults(BaseModel):
+    summaries: Dict[int, Summary]
+    failures: Dict[int, str]
+
+def transform_teams(
+        year: int,
+        teams: Iterable[Team],
+        info: TeamInfo,
+        workers: Optional[int] = None,
+        force_transform=False,
+        executor: Optional[Executor] = None,
+    ) -> TransformResults:
+    teams = [t for t in teams if force_transform or not is_transformed(year, t)]
+    workers = workers or os.cpu_count() or 1
+    summaries = {}
+    failures = {}
+    if len(teams) <= 1 or (executor is None and workers <= 1):
+        outcomes = [transform_team(year, t, info, force_transform) for t in teams]
+    elif executor is not None:
+        outcomes = run_pool(executor, year, teams, info, force_transform)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            outcomes = run_pool(executor, year, teams, info, force_transform)
+    for index, summary, error in outcomes:
+        if summary is not None:
+            summaries[index] = summary
+        else:
+            failures[index] = error
+    return TransformResults(
+        summaries = summaries,
+        failures = failures,
+    )
+
+def run_pool(
+        executor: Executor,
+        year: int,
+        teams: List[Team],
+        info: TeamInfo,
+        force_transform=False,
+    ) -> List[Tuple[int, Optional[Summary], Optional[str]]]:
+    futures = [executor.submit(transform_team_tracked, year, t, info, force_transform) for t in teams]
+    outcomes = []
+    for future in as_completed(futures):
+        outcome, events = future.result()
+        merge_events(events)
+        outcomes.append(outcome)
+    get_year_storage(year).refresh()
+    return outcomes
+
+def transform_team_tracked(
+        year: int,
+        team: Team,
+        info: TeamInfo,
+        force_transform=False,
+    ) -> Tuple[Tuple[int, Optional[Summary], Optional[str]], List[Event]]:
+    reset()
+    outcome = transform_team(year, team, info, force_transform)
+    return (outcome, get_events())
+
+def transform_team(
+        year: int,
+        team: Team,
+        info: TeamInfo,
+        force_transform=False,
+    ) -> Tuple[int, Optional[Summary], Optional[str]]:
+    try:
+        stats = get_stats_for_team(year, team, info, force_transform=force_transform)
+        roster = get_roster_for_team(year, team, info, force_transform=force_transform)
+        summary = get_summary_for_team(year, team, roster, stats, force_transform=force_transform)
+        return (team.index, summary, None)
+    except Exception:
+        return (team.index, None, traceback.format_exc())
+
+def is_transformed(year: int, team: Team) -> bool:
+    return (
+        is_cached(year, STATS_TEAM_FORMAT.format(team.safe_abbrev), get_stats_inputs(team), STATS_VERSION) and
+        is_cached(year, ROSTER_TEAM_FORMAT.format(team.safe_abbrev), get_roster_inputs(team), ROSTER_VERSION) and
+        is_cached(year, SUMMARY_TEAM_FORMAT.format(team.safe_abbrev), get_summary_inputs(team), SUMMARY_VERSION)
+    )
+
+def get_summaries_for_bracket(
+    year: int,
+    bracket: Bracket,
+    workers: Optional[int] = None,
+    force_transform=False,
+    downloads: Optional[Executor] = None,
+    parsers: Optional[Executor] = None,
+    refresh=False,
+) -> Tuple[List[Summary], Dict[int, str]]:
+    info = get_team_urls(year, bracket.teams.values())
+    fetch_team_pages(year, bracket.teams.values(), info, force=refresh, executor=downloads)
+    results = transform_teams(year, bracket.teams.values(), info, workers, force_transform, parsers)
+    summaries = [
+        results.summaries.get(team.index) or get_summary(year, team, info)
+        for team in bracket.teams.values()
+        if team.index not in results.failures
+    ]
+    return (summaries, results.failures)
+
+def check_failures(bracket: Bracket, failures: Dict[int, str]):
+    if not failures:
+        return
+    for index, error in failures.items():
+        print('Failed to transform {}:\n{}'.format(bracket.teams[index].name, error))
+        name = SUMMARY_TEAM_FORMAT.format(bracket.teams[index].safe_abbrev)
+        record(Event(stage=get_stage(name), name=name, outcome=FAILED, error=error))
+    names = sorted(bracket.teams[i].name for i in failures)
+    raise Exception('Failed to transform {} teams: {}'.format(len(names), ', '.join(names)))
+
+def get_summary(
+    year: int,
+    team: Team,
+    info: TeamInfo,
+) -> Summary:
+    stats = get_stats_for_team(year, team, info)
+    roster = get_roster_for_team(year, team, info)
+    return get_summary_for_team(year, team, roster, stats)
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+
+import hashlib
+import json
+
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type, TypeVar
+
+from pydantic import BaseModel
+from pydantic.fields import ModelField, SHAPE_LIST, SHAPE_SINGLETON
+from pydantic.utils import lenient_issubclass
+
+HEADER_PREFIX = '#madness '
+HEADER_VERSION = 1
+
+M = TypeVar('M', bound=BaseModel)
+Builder = Callable[[Any], Any]
+
+_fingerprints: Dict[Type[BaseModel], str] = {}
+_plans: Dict[Type[BaseModel], List[Tuple[str, str, Builder]]] = {}
+
+class Header(BaseModel):
+    version: int
+    schema_hash: str
+    sha256: str
+
+class UntrustedError(Exception):
+    pass
+
+def dump_trusted(model: BaseModel) -> str:
+    body = json.dumps(model.dict(), indent=2)
+    header = Header(
+        version = HEADER_VERSION,
+        schema_hash = get_fingerprint(type(model)),
+        sha256 = hash_text(body),
+    )
+    return HEADER_PREFIX + header.json() + '\n' + body
+
+def load_trusted(cls: Type[M], text: str) -> M:
+    header, body = split_header(text)
+    data = json.loads(body)
+    if is_trusted(cls, header, body):
+        try:
+            return construct_model(cls, data)
+        except UntrustedError:
+            pass
+    return cls(**data)
+
+def split_header(text: str) -> Tuple[Optional[Header], str]:
+    if not text.startswith(HEADER_PREFIX):
+        return (None, text)
+    line, _, body = text.partition('\n')
+    try:
+        return (Header.parse_raw(line[len(HEADER_PREFIX):]), body)
+    except ValueError:
+        return (None, body)
+
+def is_trusted(cls: Type[BaseModel], header: Optional[Header], body: str) -> bool:
+    return (
+        header is not None and
+        header.version == HEADER_VERSION and
+        header.schema_hash == get_fingerprint(cls) and
+        header.sha256 == hash_text(body)
+    )
+
+def get_fingerprint(cls: Type[BaseModel]) -> str:
+    if cls not in _fingerprints:
+        _fingerprints[cls] = hash_text(cls.schema_json(sort_keys=True))
+    return _fingerprints[cls]
+
+def hash_text(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+def construct_model(cls: Type[M], data: Dict[str, Any]) -> M:
+    plan = get_plan(cls)
+    if any(alias not in data for _, alias, _ in plan):
+        values = {name: builder(data[alias]) for name, alias, builder in plan if alias in data}
+        return cls.construct(_fields_set=set(values.keys()), **values)
+    model = object.__new__(cls)
+    object.__setattr__(model, '__dict__', {name: builder(data[alias]) for name, alias, builder in plan})
+    object.__setattr__(model, '__fields_set__', set(cls.__fields__.keys()))
+    return model
+
+def get_plan(cls: Type[BaseModel]) -> List[Tuple[str, str, Builder]]:
+    if cls not in _plans:
+        _plans[cls] = [(name, f.alias, get_builder(f)) for name, f in cls.__fields__.items()]
+    return _plans[cls]
+
+def get_builder(field: ModelField) -> Builder:
+    if is_plain(field):
+        return identity
+    if field.shape == SHAPE_SINGLETON:
+        cls = field.type_
+        return lambda v: None if v is None else construct_model(cls, v)
+    if field.shape == SHAPE_LIST:
+        item = get_builder(field.sub_fields[0])
+        return lambda v: None if v is None else [item(i) for i in v]
+    key_type = field.key_field.type_
+    key = key_type if key_type in (int, float) else identity
+    item = get_builder(field.sub_fields[0])
+    return lambda v: None if v is None else {key(k): item(i) for k, i in v.items()}
+
+def is_plain(field: ModelField) -> bool:
+    if field.shape == SHAPE_SINGLETON:
+        if field.sub_fields:
+            raise UntrustedError('Unsupported field: {}'.format(field))
+        return not lenient_issubclass(field.type_, BaseModel)
+    if field.shape == SHAPE_LIST:
+        return is_plain(field.sub_fields[0])
+    if field.key_field is not None:
+        return field.key_field.type_ is str and is_plain(field.sub_fields[0])
+    raise UntrustedError('Unsupported field: {}'.format(field))
+
+def identity(value: Any) -> Any:
+    return value